@@ -0,0 +1,61 @@
+"""Shared service dependencies for API routes."""
+from fastapi import FastAPI, Request
+from app.config import settings
+from app.services.anomaly_detector import AnomalyDetector, get_detector
+from app.services.feature_extractor import FeatureExtractor
+from app.services.metrics_rollup import MetricsRollup
+from app.services.prediction_batcher import PredictionBatcher
+from app.services.traffic_writer import TrafficWriter
+
+
+def init_services(app: FastAPI) -> None:
+    """Create the process-wide service singletons on app state."""
+    if getattr(app.state, "anomaly_detector", None) is None:
+        app.state.anomaly_detector = get_detector()
+    if getattr(app.state, "feature_extractor", None) is None:
+        app.state.feature_extractor = FeatureExtractor()
+    if getattr(app.state, "prediction_batcher", None) is None:
+        app.state.prediction_batcher = PredictionBatcher(
+            app.state.anomaly_detector,
+            max_batch_size=settings.prediction_batch_size,
+            max_wait_ms=settings.prediction_batch_wait_ms
+        )
+    if getattr(app.state, "traffic_writer", None) is None:
+        app.state.traffic_writer = TrafficWriter(
+            max_batch_size=settings.ingest_write_batch_size,
+            max_wait_ms=settings.ingest_write_batch_wait_ms
+        )
+    if getattr(app.state, "metrics_rollup", None) is None:
+        app.state.metrics_rollup = MetricsRollup()
+
+
+def get_anomaly_detector(request: Request) -> AnomalyDetector:
+    """Get the shared anomaly detector."""
+    # Services are created in lifespan; fall back to creating them here when
+    # lifespan has not run (e.g. TestClient used outside a `with` block)
+    init_services(request.app)
+    return request.app.state.anomaly_detector
+
+
+def get_feature_extractor(request: Request) -> FeatureExtractor:
+    """Get the shared feature extractor."""
+    init_services(request.app)
+    return request.app.state.feature_extractor
+
+
+def get_prediction_batcher(request: Request) -> PredictionBatcher:
+    """Get the shared prediction batcher."""
+    init_services(request.app)
+    return request.app.state.prediction_batcher
+
+
+def get_traffic_writer(request: Request) -> TrafficWriter:
+    """Get the shared traffic writer."""
+    init_services(request.app)
+    return request.app.state.traffic_writer
+
+
+def get_metrics_rollup(request: Request) -> MetricsRollup:
+    """Get the shared metrics rollup."""
+    init_services(request.app)
+    return request.app.state.metrics_rollup
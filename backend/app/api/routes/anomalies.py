@@ -1,7 +1,10 @@
 """Anomaly endpoints."""
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import func, select, tuple_
 from sqlalchemy.orm import Session
-from typing import Optional
+from datetime import datetime
+from typing import Optional, Tuple
+import base64
 from app.database.base import get_db
 from app.database.models import Anomaly, TrafficLog
 from app.models.schemas import AnomaliesListResponse, AnomalyResponse
@@ -11,63 +14,118 @@ logger = get_logger(__name__)
 router = APIRouter(prefix="/api/anomalies", tags=["anomalies"])
 
 
+def encode_cursor(row) -> str:
+    """Encode an anomaly row's (detected_at, id) sort key as an opaque cursor."""
+    raw = f"{row.detected_at.isoformat()}|{row.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor produced by encode_cursor."""
+    detected_at, anomaly_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+    return datetime.fromisoformat(detected_at), int(anomaly_id)
+
+
 @router.get("", response_model=AnomaliesListResponse)
-async def get_anomalies(
+def get_anomalies(
     limit: int = Query(50, ge=1, le=1000, description="Maximum number of anomalies to return"),
     offset: int = Query(0, ge=0, description="Number of anomalies to skip"),
     resolved: Optional[bool] = Query(None, description="Filter by resolved status"),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from a previous page's next_cursor (replaces offset)"),
     db: Session = Depends(get_db)
 ):
     """Get detected anomalies."""
+    after = None
+    if cursor is not None:
+        try:
+            after = decode_cursor(cursor)
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
     try:
-        # Build query
-        query = db.query(Anomaly)
+        # Select only the columns the response needs, with the traffic log
+        # outer-joined in the same round trip - no ORM objects are built.
+        # The windowed count returns the filtered total alongside each row,
+        # so count and page come back in a single statement.
+        stmt = select(
+            Anomaly.id,
+            Anomaly.detected_at,
+            Anomaly.anomaly_score,
+            Anomaly.anomaly_type,
+            Anomaly.features,
+            Anomaly.is_resolved,
+            TrafficLog.id.label("tl_id"),
+            TrafficLog.endpoint.label("tl_endpoint"),
+            TrafficLog.method.label("tl_method"),
+            TrafficLog.status_code.label("tl_status_code"),
+            TrafficLog.response_time_ms.label("tl_response_time_ms"),
+            TrafficLog.timestamp.label("tl_timestamp"),
+            func.count().over().label("total")
+        ).select_from(Anomaly).outerjoin(TrafficLog, Anomaly.traffic_log_id == TrafficLog.id)
         
         # Apply filters
         if resolved is not None:
-            query = query.filter(Anomaly.is_resolved == resolved)
+            stmt = stmt.where(Anomaly.is_resolved == resolved)
+        
+        # Apply pagination and ordering - with a cursor, seek past the last
+        # row seen instead of scanning and discarding `offset` rows
+        stmt = stmt.order_by(Anomaly.detected_at.desc(), Anomaly.id.desc())
+        if after is not None:
+            stmt = stmt.where(tuple_(Anomaly.detected_at, Anomaly.id) < tuple_(*after))
+        else:
+            stmt = stmt.offset(offset)
+        rows = db.execute(stmt.limit(limit)).all()
         
-        # Get total count
-        total = query.count()
+        # Get total count - the windowed count only covers rows after the
+        # cursor, and an offset past the end returns no rows to carry it
+        if rows and after is None:
+            total = rows[0].total
+        elif after is not None or offset > 0:
+            count_stmt = select(func.count(Anomaly.id))
+            if resolved is not None:
+                count_stmt = count_stmt.where(Anomaly.is_resolved == resolved)
+            total = db.execute(count_stmt).scalar()
+        else:
+            total = 0
         
-        # Apply pagination and ordering
-        anomalies = query.order_by(Anomaly.detected_at.desc()).offset(offset).limit(limit).all()
+        next_cursor = encode_cursor(rows[-1]) if len(rows) == limit else None
         
-        # Convert to response format
+        # Convert to response format - values come straight from the
+        # database, so skip Pydantic validation with model_construct
         anomaly_responses = []
-        for anomaly in anomalies:
+        for row in rows:
             # Get associated traffic log if available
-            traffic_log_data = None
-            if anomaly.traffic_log_id:
-                traffic_log = db.query(TrafficLog).filter(TrafficLog.id == anomaly.traffic_log_id).first()
-                if traffic_log:
-                    traffic_log_data = {
-                        "id": traffic_log.id,
-                        "endpoint": traffic_log.endpoint,
-                        "method": traffic_log.method,
-                        "status_code": traffic_log.status_code,
-                        "response_time_ms": traffic_log.response_time_ms,
-                        "timestamp": traffic_log.timestamp.isoformat()
-                    }
+            traffic_log_data = None if row.tl_id is None else {
+                "id": row.tl_id,
+                "endpoint": row.tl_endpoint,
+                "method": row.tl_method,
+                "status_code": row.tl_status_code,
+                "response_time_ms": row.tl_response_time_ms,
+                "timestamp": row.tl_timestamp
+            }
             
             anomaly_responses.append(
-                AnomalyResponse(
-                    id=anomaly.id,
-                    detected_at=anomaly.detected_at,
-                    anomaly_score=anomaly.anomaly_score,
-                    anomaly_type=anomaly.anomaly_type,
-                    features=anomaly.features,
-                    is_resolved=anomaly.is_resolved,
+                AnomalyResponse.model_construct(
+                    id=row.id,
+                    detected_at=row.detected_at,
+                    anomaly_score=row.anomaly_score,
+                    anomaly_type=row.anomaly_type,
+                    features=row.features,
+                    is_resolved=row.is_resolved,
                     traffic_log=traffic_log_data
                 )
             )
         
-        return AnomaliesListResponse(
+        # Serialize in pydantic-core directly; returning the model would have
+        # FastAPI dump it to dicts and validate every item again
+        response = AnomaliesListResponse.model_construct(
             anomalies=anomaly_responses,
             total=total,
             limit=limit,
-            offset=offset
+            offset=offset,
+            next_cursor=next_cursor
         )
+        return Response(content=response.model_dump_json(), media_type="application/json")
     
     except Exception as e:
         logger.error(f"Error fetching anomalies: {e}")
@@ -1,8 +1,11 @@
 """Authentication endpoints."""
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from datetime import datetime, timezone
+from functools import lru_cache
 from app.database.base import get_db
 from app.database.models import User
 from app.models.schemas import UserCreate, UserResponse, Token
@@ -15,6 +18,16 @@ router = APIRouter(prefix="/api/auth", tags=["auth"])
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+# Demo users have no database row, so the same response is reused for every
+# request; its created_at is a fixed date rather than a per-request time
+_DEMO_USER_RESPONSE = UserResponse(
+    id=0,
+    email="demo@securaflow.com",
+    username="demo_user",
+    is_active=True,
+    created_at=datetime(2024, 1, 1, tzinfo=timezone.utc)
+)
+
 
 def get_user_by_email(db: Session, email: str) -> Optional[User]:
     """Get user by email."""
@@ -26,10 +39,19 @@ def get_user_by_username(db: Session, username: str) -> Optional[User]:
     return db.query(User).filter(User.username == username).first()
 
 
+@lru_cache(maxsize=1)
+def _dummy_password_hash() -> str:
+    """Hash verified against for unknown usernames, computed on first use."""
+    return get_password_hash("invalid-password-placeholder")
+
+
 def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
     """Authenticate a user."""
     user = get_user_by_username(db, username)
     if not user:
+        # Pay the same bcrypt cost as a real user so unknown usernames
+        # can't be told apart by response time
+        verify_password(password, _dummy_password_hash())
         return None
     if not verify_password(password, user.hashed_password):
         return None
@@ -37,18 +59,16 @@ def authenticate_user(db: Session, username: str, password: str) -> Optional[Use
 
 
 @router.post("/signup", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def signup(user_data: UserCreate, db: Session = Depends(get_db)):
+def signup(user_data: UserCreate, db: Session = Depends(get_db)):
     """Create a new user account."""
-    # Check if user already exists
-    if get_user_by_email(db, user_data.email):
+    # Check if user already exists - one lookup covers both unique columns
+    existing = db.query(User.email, User.username).filter(
+        or_(User.email == user_data.email, User.username == user_data.username)
+    ).first()
+    if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
-        )
-    if get_user_by_username(db, user_data.username):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already taken"
+            detail="Email already registered" if existing.email == user_data.email else "Username already taken"
         )
     
     # Create new user
@@ -59,22 +79,26 @@ async def signup(user_data: UserCreate, db: Session = Depends(get_db)):
         hashed_password=hashed_password
     )
     db.add(user)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # Lost a race with a concurrent signup - the unique index has the final
+        # say, so look up which column the winning row now holds
+        db.rollback()
+        email_taken = db.query(User.id).filter(User.email == user_data.email).first() is not None
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered" if email_taken else "Username already taken"
+        )
     db.refresh(user)
     
     logger.info(f"New user created: {user.username}")
     
-    return UserResponse(
-        id=user.id,
-        email=user.email,
-        username=user.username,
-        is_active=user.is_active,
-        created_at=user.created_at
-    )
+    return UserResponse.model_validate(user)
 
 
 @router.post("/login", response_model=Token)
-async def login(
+def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
@@ -105,7 +129,7 @@ async def login(
 
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user(
+def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
 ):
@@ -130,14 +154,7 @@ async def get_current_user(
     
     # Handle demo users
     if is_demo:
-        from datetime import datetime, timezone
-        return UserResponse(
-            id=0,
-            email="demo@securaflow.com",
-            username="demo_user",
-            is_active=True,
-            created_at=datetime.now(timezone.utc)
-        )
+        return _DEMO_USER_RESPONSE
     
     user = get_user_by_username(db, username)
     if user is None:
@@ -147,13 +164,7 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    return UserResponse(
-        id=user.id,
-        email=user.email,
-        username=user.username,
-        is_active=user.is_active,
-        created_at=user.created_at
-    )
+    return UserResponse.model_validate(user)
 
 
 @router.post("/demo")
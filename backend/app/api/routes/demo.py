@@ -2,21 +2,19 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta, timezone
-import random
+from typing import List
+import numpy as np
 from app.database.base import get_db
-from app.database.models import TrafficLog, Anomaly
 from app.models.schemas import TrafficData
+from app.api.dependencies import get_anomaly_detector, get_feature_extractor
 from app.services.feature_extractor import FeatureExtractor
-from app.services.anomaly_detector import AnomalyDetector
+from app.services.anomaly_detector import AnomalyDetector, FEATURE_ORDER
+from app.services.traffic_store import store_traffic_batch
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 router = APIRouter(prefix="/api/demo", tags=["demo"])
 
-# Initialize services
-feature_extractor = FeatureExtractor()
-anomaly_detector = AnomalyDetector()
-
 # Common endpoints and methods
 ENDPOINTS = [
     "/api/users",
@@ -39,79 +37,98 @@ USER_AGENTS = [
 ]
 
 
-def generate_normal_traffic_data(timestamp: datetime) -> dict:
-    """Generate normal traffic data - fast, successful, small-medium requests."""
-    return {
-        "endpoint": random.choice(ENDPOINTS),
-        "method": random.choice(METHODS),
-        "status_code": random.choices(
-            [200, 201, 204],
-            weights=[85, 12, 3]
-        )[0],
-        "response_time_ms": random.randint(20, 150),  # Fast: 20-150ms
-        "request_size_bytes": random.randint(50, 2000),  # Small-medium
-        "response_size_bytes": random.randint(100, 5000),  # Small-medium
-        "ip_address": f"{random.randint(1, 255)}.{random.randint(1, 255)}.{random.randint(1, 255)}.{random.randint(1, 255)}",
-        "user_agent": random.choice(USER_AGENTS),
-        "timestamp": timestamp,
-    }
+# Demo anomaly kinds (0 = normal traffic)
+NORMAL, SERVER_ERROR, VERY_SLOW, VERY_LARGE = range(4)
+
+# Precomputed octet strings so IPs are built by lookup + join, not int -> str
+_OCTETS = [str(i) for i in range(256)]
 
 
-def generate_anomaly_traffic_data(timestamp: datetime) -> dict:
-    """Generate anomaly traffic data - very distinct patterns for easy detection."""
-    anomaly_type = random.choice([
-        "server_error",      # 5xx errors - clear anomaly
-        "very_slow",         # >3000ms - clear anomaly
-        "very_large",        # >10MB - clear anomaly
-    ])
+def generate_traffic_data(
+    rng: np.random.Generator,
+    timestamps: List[datetime],
+    anomaly_rate: float
+) -> List[dict]:
+    """
+    Generate demo traffic data for the given timestamps.
     
-    if anomaly_type == "server_error":
-        # Server errors: 5xx status codes, small error responses
-        return {
-            "endpoint": random.choice(ENDPOINTS),
-            "method": random.choice(METHODS),
-            "status_code": random.choice([500, 502, 503, 504]),  # Always 5xx
-            "response_time_ms": random.randint(100, 1000),  # Can vary
-            "request_size_bytes": random.randint(50, 2000),  # Normal request
-            "response_size_bytes": random.randint(50, 300),  # Small error response
-            "ip_address": f"{random.randint(1, 255)}.{random.randint(1, 255)}.{random.randint(1, 255)}.{random.randint(1, 255)}",
-            "user_agent": random.choice(USER_AGENTS),
-            "timestamp": timestamp,
-        }
-    elif anomaly_type == "very_slow":
-        # Very slow responses: >3000ms but successful
-        return {
-            "endpoint": random.choice(ENDPOINTS),
-            "method": random.choice(METHODS),
-            "status_code": 200,  # Successful but slow
-            "response_time_ms": random.randint(3000, 10000),  # Very slow: 3-10 seconds
-            "request_size_bytes": random.randint(50, 2000),  # Normal request
-            "response_size_bytes": random.randint(100, 5000),  # Normal response
-            "ip_address": f"{random.randint(1, 255)}.{random.randint(1, 255)}.{random.randint(1, 255)}.{random.randint(1, 255)}",
-            "user_agent": random.choice(USER_AGENTS),
-            "timestamp": timestamp,
-        }
-    else:  # very_large
-        # Very large requests/responses: >10MB
-        return {
-            "endpoint": random.choice(ENDPOINTS),
-            "method": random.choice(["GET", "POST"]),  # Large requests
-            "status_code": 200,  # Successful
-            "response_time_ms": random.randint(100, 500),  # Normal response time
-            "request_size_bytes": random.randint(10000000, 20000000),  # Very large: 10-20MB
-            "response_size_bytes": random.randint(15000000, 30000000),  # Very large: 15-30MB
-            "ip_address": f"{random.randint(1, 255)}.{random.randint(1, 255)}.{random.randint(1, 255)}.{random.randint(1, 255)}",
-            "user_agent": random.choice(USER_AGENTS),
-            "timestamp": timestamp,
+    Each column is sampled for all rows at once with NumPy. Normal traffic is
+    fast, successful and small-medium; anomalies are very distinct patterns
+    for easy detection:
+    - server_error: 5xx status codes, small error responses
+    - very_slow: >3000ms but successful
+    - very_large: >10MB requests/responses
+    """
+    n = len(timestamps)
+    
+    # Pick normal vs. anomaly per row, then one of the anomaly kinds uniformly
+    kind = np.where(rng.random(n) < anomaly_rate, rng.integers(SERVER_ERROR, VERY_LARGE + 1, n), NORMAL)
+    is_server_error = kind == SERVER_ERROR
+    is_very_slow = kind == VERY_SLOW
+    is_very_large = kind == VERY_LARGE
+    
+    endpoint_idx = rng.integers(0, len(ENDPOINTS), n)
+    # Large requests are always GET or POST (the first two METHODS)
+    method_idx = np.where(is_very_large, rng.integers(0, 2, n), rng.integers(0, len(METHODS), n))
+    user_agent_idx = rng.integers(0, len(USER_AGENTS), n)
+    
+    status_code = np.select(
+        [kind == NORMAL, is_server_error],
+        [rng.choice([200, 201, 204], size=n, p=[0.85, 0.12, 0.03]), rng.choice([500, 502, 503, 504], size=n)],
+        default=200
+    )
+    response_time_ms = np.select(
+        [kind == NORMAL, is_server_error, is_very_slow],
+        [rng.integers(20, 151, n), rng.integers(100, 1001, n), rng.integers(3000, 10001, n)],
+        default=rng.integers(100, 501, n)
+    )
+    request_size_bytes = np.where(
+        is_very_large, rng.integers(10000000, 20000001, n), rng.integers(50, 2001, n)
+    )
+    response_size_bytes = np.select(
+        [is_server_error, is_very_large],
+        [rng.integers(50, 301, n), rng.integers(15000000, 30000001, n)],
+        default=rng.integers(100, 5001, n)
+    )
+    ip_addresses = [
+        '.'.join(map(_OCTETS.__getitem__, octets))
+        for octets in rng.integers(1, 256, (n, 4)).tolist()
+    ]
+    
+    return [
+        {
+            "endpoint": ENDPOINTS[e],
+            "method": METHODS[m],
+            "status_code": sc,
+            "response_time_ms": rt,
+            "request_size_bytes": req,
+            "response_size_bytes": resp,
+            "ip_address": ip,
+            "user_agent": USER_AGENTS[ua],
+            "timestamp": ts,
         }
+        for e, m, sc, rt, req, resp, ip, ua, ts in zip(
+            endpoint_idx.tolist(),
+            method_idx.tolist(),
+            status_code.tolist(),
+            response_time_ms.tolist(),
+            request_size_bytes.tolist(),
+            response_size_bytes.tolist(),
+            ip_addresses,
+            user_agent_idx.tolist(),
+            timestamps,
+        )
+    ]
 
 
 @router.post("/generate")
-async def generate_demo_data(
+def generate_demo_data(
     count: int = Query(100, ge=1, le=1000, description="Number of traffic logs to generate"),
     anomaly_rate: float = Query(0.15, ge=0.0, le=1.0, description="Percentage of anomalies (0.0 to 1.0)"),
     hours_back: int = Query(24, ge=1, le=168, description="Generate data for the last N hours"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    feature_extractor: FeatureExtractor = Depends(get_feature_extractor),
+    anomaly_detector: AnomalyDetector = Depends(get_anomaly_detector)
 ):
     """
     Generate demo traffic data for testing and demonstration.
@@ -126,71 +143,33 @@ async def generate_demo_data(
         end_time = datetime.now(timezone.utc)
         start_time = end_time - timedelta(hours=hours_back)
         
-        # Generate timestamps distributed over the time range
-        timestamps = []
-        for i in range(count):
-            # Distribute timestamps evenly over the time range
-            time_offset = (i / count) * hours_back
-            timestamp = start_time + timedelta(hours=time_offset)
-            timestamps.append(timestamp)
-        
-        # Shuffle timestamps for more realistic distribution
-        random.shuffle(timestamps)
+        # Draw timestamps uniformly over the time range - the RNG already
+        # gives a random order, so no shuffle is needed
+        rng = np.random.default_rng()
+        timestamps = [
+            start_time + timedelta(seconds=offset)
+            for offset in rng.uniform(0, hours_back * 3600, count).tolist()
+        ]
         
-        traffic_logs_created = 0
-        anomalies_created = 0
+        traffic_data_list = []
         
-        for timestamp in timestamps:
+        for traffic_data_dict in generate_traffic_data(rng, timestamps, anomaly_rate):
             try:
-                # Generate normal or anomaly traffic
-                if random.random() < anomaly_rate:
-                    traffic_data_dict = generate_anomaly_traffic_data(timestamp)
-                else:
-                    traffic_data_dict = generate_normal_traffic_data(timestamp)
-                
                 # Create TrafficData object
-                traffic_data = TrafficData(**traffic_data_dict)
-                
-                # Extract features
-                features = feature_extractor.extract_features(traffic_data)
-                
-                # Run anomaly detection
-                prediction = anomaly_detector.predict(features)
-                
-                # Store traffic log
-                traffic_log = TrafficLog(
-                    timestamp=traffic_data.timestamp,
-                    endpoint=traffic_data.endpoint,
-                    method=traffic_data.method,
-                    status_code=traffic_data.status_code,
-                    response_time_ms=traffic_data.response_time_ms,
-                    request_size_bytes=traffic_data.request_size_bytes,
-                    response_size_bytes=traffic_data.response_size_bytes,
-                    ip_address=traffic_data.ip_address,
-                    user_agent=traffic_data.user_agent
-                )
-                db.add(traffic_log)
-                db.flush()  # Get the ID
-                
-                # Store anomaly if detected
-                if prediction["is_anomaly"]:
-                    anomaly = Anomaly(
-                        detected_at=traffic_data.timestamp,
-                        traffic_log_id=traffic_log.id,
-                        anomaly_score=prediction["anomaly_score"],
-                        anomaly_type=prediction["anomaly_type"],
-                        features=features,
-                        is_resolved=False
-                    )
-                    db.add(anomaly)
-                    anomalies_created += 1
-                
-                traffic_logs_created += 1
+                traffic_data_list.append(TrafficData(**traffic_data_dict))
                 
             except Exception as e:
                 logger.error(f"Error generating traffic log: {e}")
                 continue
         
+        # Extract features and run anomaly detection on the whole batch at once
+        features = feature_extractor.extract_features_batch(traffic_data_list)
+        predictions = anomaly_detector.predict_array(features)
+        features_list = [dict(zip(FEATURE_ORDER, row)) for row in features.tolist()]
+        
+        log_ids, anomalies_created = store_traffic_batch(db, traffic_data_list, features_list, predictions)
+        traffic_logs_created = len(log_ids)
+        
         # Commit all at once
         db.commit()
         
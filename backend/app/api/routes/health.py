@@ -2,9 +2,11 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from sqlalchemy import text
+from typing import Optional, Tuple
 import time
 from app.database.base import get_db
 from app.models.schemas import HealthResponse
+from app.api.dependencies import get_anomaly_detector
 from app.services.anomaly_detector import AnomalyDetector
 from app.utils.logger import get_logger
 
@@ -13,12 +15,25 @@ router = APIRouter(prefix="/api/health", tags=["health"])
 
 # Track startup time for uptime calculation
 startup_time = time.time()
-anomaly_detector = AnomalyDetector()
+
+# Short-lived, process-local cache of the last health result so that bursts
+# of liveness/readiness probes collapse into one real check per window
+_TTL = 2.0
+_cached: Optional[Tuple[float, HealthResponse]] = None
 
 
 @router.get("", response_model=HealthResponse)
-async def health_check(db: Session = Depends(get_db)):
+def health_check(
+    db: Session = Depends(get_db),
+    anomaly_detector: AnomalyDetector = Depends(get_anomaly_detector)
+):
     """Health check endpoint."""
+    global _cached
+    
+    now = time.monotonic()
+    if _cached is not None and now - _cached[0] < _TTL:
+        return _cached[1]
+    
     try:
         # Check database connection
         db_status = "connected"
@@ -36,12 +51,15 @@ async def health_check(db: Session = Depends(get_db)):
         
         status = "healthy" if db_status == "connected" and model_loaded else "degraded"
         
-        return HealthResponse(
+        response = HealthResponse(
             status=status,
             database=db_status,
             model_loaded=model_loaded,
-            uptime_seconds=uptime_seconds
+            uptime_seconds=uptime_seconds,
+            prediction_cache=anomaly_detector.score_cache.stats()
         )
+        _cached = (now, response)
+        return response
     
     except Exception as e:
         logger.error(f"Health check error: {e}")
@@ -1,58 +1,59 @@
 """Model performance metrics endpoints."""
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import and_, case, desc, func, not_, select
 from typing import List
+from app.config import Settings, get_settings
 from app.database.base import get_db
-from app.database.models import ModelPerformance, Anomaly, TrafficLog
+from app.database.models import ModelPerformance, Anomaly, TrafficLog, MODEL_PERFORMANCE_HISTORY_COLUMNS
 from app.models.schemas import ModelPerformanceResponse, ModelPerformanceListResponse
+from app.utils.cache import cache_get, cache_set, cache_delete_prefix
 from app.utils.logger import get_logger
 from datetime import datetime, timezone
 
 logger = get_logger(__name__)
-router = APIRouter(prefix="/api/model-metrics", tags=["model-metrics"])
+router = APIRouter(prefix="/api/model-metrics", tags=["model-metrics"], default_response_class=ORJSONResponse)
 
 
 @router.get("", response_model=ModelPerformanceListResponse)
-async def get_model_metrics(
+def get_model_metrics(
     limit: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    settings: Settings = Depends(get_settings)
 ):
     """Get model performance metrics history."""
     try:
-        metrics = db.query(ModelPerformance).order_by(
-            desc(ModelPerformance.evaluation_date)
-        ).limit(limit).all()
-        
-        return ModelPerformanceListResponse(
-            metrics=[ModelPerformanceResponse(
-                id=m.id,
-                model_version=m.model_version,
-                evaluation_date=m.evaluation_date,
-                total_predictions=m.total_predictions,
-                true_positives=m.true_positives,
-                false_positives=m.false_positives,
-                true_negatives=m.true_negatives,
-                false_negatives=m.false_negatives,
-                precision=m.precision,
-                recall=m.recall,
-                f1_score=m.f1_score,
-                accuracy=m.accuracy,
-                auc_roc=m.auc_roc,
-                avg_anomaly_score=m.avg_anomaly_score,
-                threshold_used=m.threshold_used,
-            ) for m in metrics],
-            total=len(metrics)
-        )
+        cache_key = f"model_metrics:{limit}"
+        cached = cache_get(cache_key)
+        if cached is not None:
+            return Response(content=cached, media_type="application/json")
+        
+        # Select just the response columns (served by the covering index)
+        # rather than loading ORM objects
+        columns = [getattr(ModelPerformance, name) for name in MODEL_PERFORMANCE_HISTORY_COLUMNS]
+        rows = db.execute(
+            select(*columns).order_by(desc(ModelPerformance.evaluation_date)).limit(limit)
+        ).mappings().all()
+        
+        # The selected columns are exactly ModelPerformanceResponse's fields,
+        # so the mappings are already the response body
+        response = ORJSONResponse({
+            "metrics": [dict(row) for row in rows],
+            "total": len(rows)
+        })
+        cache_set(cache_key, response.body, settings.model_metrics_cache_ttl_seconds)
+        return response
     except Exception as e:
         logger.error(f"Error fetching model metrics: {e}")
         raise HTTPException(status_code=500, detail=f"Error fetching model metrics: {str(e)}")
 
 
 @router.post("/evaluate")
-async def evaluate_model_performance(
+def evaluate_model_performance(
     limit: int = Query(None, ge=50, le=5000, description="Number of recent traffic logs to evaluate (defaults to config setting)"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    settings: Settings = Depends(get_settings)
 ):
     """
     Evaluate current model performance based on recent predictions.
@@ -62,78 +63,60 @@ async def evaluate_model_performance(
     Perfect for demos where data might be sparse or old.
     """
     try:
-        from app.config import settings
-        
         # Use provided limit or default from config
         evaluation_limit = limit if limit is not None else settings.model_evaluation_logs
         
         logger.info(f"Evaluating model performance on last {evaluation_limit} traffic logs")
         
-        # Get the most recent N traffic logs
-        all_logs = db.query(TrafficLog).order_by(
-            desc(TrafficLog.timestamp)
-        ).limit(evaluation_limit).all()
-        
-        if not all_logs:
-            raise HTTPException(
-                status_code=404, 
-                detail="No traffic logs found for evaluation"
-            )
-        
-        # Get all anomaly log IDs from these traffic logs
-        log_ids = [log.id for log in all_logs]
-        anomalies_in_window = db.query(Anomaly).filter(
-            Anomaly.traffic_log_id.in_(log_ids)
-        ).all()
+        # Most recent N traffic logs
+        recent_logs = select(
+            TrafficLog.id,
+            TrafficLog.is_anomalous
+        ).order_by(desc(TrafficLog.timestamp)).limit(evaluation_limit).subquery()
         
-        # Create a set of traffic log IDs that have detected anomalies
-        anomaly_log_ids = {a.traffic_log_id for a in anomalies_in_window if a.traffic_log_id}
+        # One row per detected log, so logs with several anomalies count once
+        log_scores = select(
+            Anomaly.traffic_log_id,
+            func.max(Anomaly.anomaly_score).label('score')
+        ).where(
+            Anomaly.traffic_log_id.in_(select(recent_logs.c.id))
+        ).group_by(Anomaly.traffic_log_id).subquery()
         
-        # Calculate metrics
+        # Calculate metrics in one aggregate query
         # True Positive: Anomaly detected AND actual anomaly (server error, very slow, or very large)
         # False Positive: Anomaly detected BUT no actual anomaly
         # True Negative: No anomaly detected AND no actual anomaly
         # False Negative: No anomaly detected BUT actual anomaly exists
+        detected = log_scores.c.traffic_log_id.isnot(None)
+        is_true_anomaly = recent_logs.c.is_anomalous
+        
+        def count_where(*conditions):
+            return func.coalesce(func.sum(case((and_(*conditions), 1), else_=0)), 0)
         
-        tp = 0
-        fp = 0
-        fn = 0
-        tn = 0
-        total_score = 0.0
-        
-        for log in all_logs:
-            # Ground truth: consider multiple anomaly indicators
-            # True anomaly if: server error (5xx), very slow response (>3000ms), or very large request (>10MB)
-            is_true_anomaly = (
-                log.status_code >= 500 or  # Server errors (5xx)
-                log.response_time_ms > 3000 or  # Very slow (>3 seconds)
-                (log.request_size_bytes and log.request_size_bytes > 10000000) or  # Very large request (>10MB)
-                (log.response_size_bytes and log.response_size_bytes > 10000000)  # Very large response (>10MB)
+        counts = db.execute(
+            select(
+                func.count().label('total'),
+                count_where(detected, is_true_anomaly).label('tp'),
+                count_where(detected, not_(is_true_anomaly)).label('fp'),
+                count_where(not_(detected), not_(is_true_anomaly)).label('tn'),
+                count_where(not_(detected), is_true_anomaly).label('fn'),
+                func.coalesce(func.sum(log_scores.c.score), 0.0).label('total_score')
+            ).select_from(recent_logs).outerjoin(
+                log_scores, log_scores.c.traffic_log_id == recent_logs.c.id
+            )
+        ).one()
+        
+        if counts.total == 0:
+            raise HTTPException(
+                status_code=404, 
+                detail="No traffic logs found for evaluation"
             )
-            
-            # Check if this log was detected as an anomaly
-            is_detected_anomaly = log.id in anomaly_log_ids
-            
-            if is_detected_anomaly:
-                if is_true_anomaly:
-                    tp += 1
-                else:
-                    fp += 1
-                # Get anomaly score
-                for anomaly in anomalies_in_window:
-                    if anomaly.traffic_log_id == log.id:
-                        total_score += anomaly.anomaly_score
-                        break
-            else:
-                if is_true_anomaly:
-                    fn += 1
-                else:
-                    tn += 1
+        
+        tp, fp, tn, fn = counts.tp, counts.fp, counts.tn, counts.fn
+        total_score = float(counts.total_score)
         
         # Calculate metrics
         total = tp + fp + tn + fn
-        if total == 0:
-            raise HTTPException(status_code=400, detail="No data available for evaluation")
         
         precision = tp / (tp + fp) if (tp + fp) > 0 else 0.0
         recall = tp / (tp + fn) if (tp + fn) > 0 else 0.0
@@ -160,23 +143,10 @@ async def evaluate_model_performance(
         db.add(model_perf)
         db.commit()
         
-        return ModelPerformanceResponse(
-            id=model_perf.id,
-            model_version=model_perf.model_version,
-            evaluation_date=model_perf.evaluation_date,
-            total_predictions=model_perf.total_predictions,
-            true_positives=model_perf.true_positives,
-            false_positives=model_perf.false_positives,
-            true_negatives=model_perf.true_negatives,
-            false_negatives=model_perf.false_negatives,
-            precision=model_perf.precision,
-            recall=model_perf.recall,
-            f1_score=model_perf.f1_score,
-            accuracy=model_perf.accuracy,
-            auc_roc=model_perf.auc_roc,
-            avg_anomaly_score=model_perf.avg_anomaly_score,
-            threshold_used=model_perf.threshold_used,
-        )
+        # Drop cached history so the new evaluation shows up immediately
+        cache_delete_prefix("model_metrics:")
+        
+        return ModelPerformanceResponse.model_validate(model_perf)
         
     except HTTPException:
         raise
@@ -1,28 +1,31 @@
 """Traffic ingestion endpoints."""
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Body, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from datetime import datetime
+from typing import List
 from app.database.base import get_db
-from app.database.models import TrafficLog, Anomaly
-from app.models.schemas import TrafficData, TrafficResponse
+from app.models.schemas import TrafficData, TrafficResponse, TrafficBatchResponse
+from app.api.dependencies import get_anomaly_detector, get_feature_extractor, get_prediction_batcher, get_traffic_writer
 from app.services.feature_extractor import FeatureExtractor
-from app.services.anomaly_detector import AnomalyDetector
+from app.services.anomaly_detector import AnomalyDetector, FEATURE_ORDER
+from app.services.prediction_batcher import PredictionBatcher
+from app.services.traffic_store import store_traffic_batch
+from app.services.traffic_writer import TrafficWriter
 from app.config import settings
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 router = APIRouter(prefix="/api/traffic", tags=["traffic"])
 
-# Initialize services (singleton pattern)
-feature_extractor = FeatureExtractor()
-anomaly_detector = AnomalyDetector()
-
 
 @router.post("", response_model=TrafficResponse)
-async def ingest_traffic(
+def ingest_traffic(
     request: Request,
     traffic_data: TrafficData,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    feature_extractor: FeatureExtractor = Depends(get_feature_extractor),
+    prediction_batcher: PredictionBatcher = Depends(get_prediction_batcher),
+    traffic_writer: TrafficWriter = Depends(get_traffic_writer)
 ):
     """
     Ingest traffic data and detect anomalies.
@@ -41,38 +44,15 @@ async def ingest_traffic(
         # Extract features
         features = feature_extractor.extract_features(traffic_data)
         
-        # Run anomaly detection
-        prediction = anomaly_detector.predict(features)
-        
-        # Store traffic log
-        traffic_log = TrafficLog(
-            timestamp=traffic_data.timestamp,
-            endpoint=traffic_data.endpoint,
-            method=traffic_data.method,
-            status_code=traffic_data.status_code,
-            response_time_ms=traffic_data.response_time_ms,
-            request_size_bytes=traffic_data.request_size_bytes,
-            response_size_bytes=traffic_data.response_size_bytes,
-            ip_address=traffic_data.ip_address,
-            user_agent=traffic_data.user_agent
-        )
-        db.add(traffic_log)
-        db.flush()  # Get the ID
+        # Run anomaly detection, batched with concurrent ingest requests
+        prediction = prediction_batcher.predict(features)
         
-        # Store anomaly if detected
+        # Store and commit traffic log (and anomaly, if detected), grouped
+        # with concurrent ingest requests into one multi-row insert
+        traffic_writer.store(db, traffic_data, features, prediction)
         if prediction["is_anomaly"]:
-            anomaly = Anomaly(
-                detected_at=traffic_data.timestamp,
-                traffic_log_id=traffic_log.id,
-                anomaly_score=prediction["anomaly_score"],
-                anomaly_type=prediction["anomaly_type"],
-                features=features,
-                is_resolved=False
-            )
-            db.add(anomaly)
-            logger.info(f"Anomaly detected: {prediction['anomaly_type']} (score: {prediction['anomaly_score']:.2f})")
-        
-        db.commit()
+            # Lazy %-formatting: skipped entirely when INFO is filtered out
+            logger.info("Anomaly detected: %s (score: %.2f)", prediction["anomaly_type"], prediction["anomaly_score"])
         
         return TrafficResponse(
             success=True,
@@ -86,3 +66,54 @@ async def ingest_traffic(
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error processing traffic data: {str(e)}")
 
+
+@router.post("/batch", response_model=TrafficBatchResponse)
+def ingest_traffic_batch(
+    traffic_batch: List[TrafficData] = Body(..., max_length=1000),
+    db: Session = Depends(get_db),
+    feature_extractor: FeatureExtractor = Depends(get_feature_extractor),
+    anomaly_detector: AnomalyDetector = Depends(get_anomaly_detector)
+):
+    """
+    Ingest many traffic records in one request.
+    
+    Runs anomaly detection over the whole batch in one model call and
+    stores all logs and anomalies with bulk inserts in a single transaction.
+    """
+    try:
+        now = datetime.now()
+        for traffic_data in traffic_batch:
+            # Set timestamp if not provided
+            if not traffic_data.timestamp:
+                traffic_data.timestamp = now
+        
+        # Extract features as one columnar matrix; the per-log dicts are only
+        # needed for the feature snapshots stored with anomalies
+        features = feature_extractor.extract_features_batch(traffic_batch)
+        predictions = anomaly_detector.predict_array(features)
+        features_list = [dict(zip(FEATURE_ORDER, row)) for row in features.tolist()]
+        
+        log_ids, anomalies_detected = store_traffic_batch(db, traffic_batch, features_list, predictions)
+        db.commit()
+        
+        if anomalies_detected:
+            logger.info("Batch ingest detected %d anomalies in %d logs", anomalies_detected, len(log_ids))
+        
+        return TrafficBatchResponse(
+            success=True,
+            ingested=len(log_ids),
+            anomalies_detected=anomalies_detected,
+            results=[
+                TrafficResponse(
+                    success=True,
+                    anomaly_detected=prediction["is_anomaly"],
+                    anomaly_score=prediction["anomaly_score"]
+                )
+                for prediction in predictions
+            ]
+        )
+    
+    except Exception as e:
+        logger.error(f"Error ingesting traffic batch: {e}")
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error processing traffic batch: {str(e)}")
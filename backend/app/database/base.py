@@ -1,31 +1,60 @@
 """Database base configuration."""
-from sqlalchemy import create_engine
+import threading
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import create_engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, scoped_session, sessionmaker
 from app.config import settings
 
 # Create database engine
+# Route handlers that touch the database are plain (sync) functions, which
+# FastAPI runs in its worker threadpool; size the pool so concurrent workers
+# don't queue on connection checkout.
+# PostgreSQL sessions run in UTC so timestamptz values come back with a UTC
+# offset, matching the naive-UTC values SQLite returns field for field.
+database_url = make_url(settings.database_url)
+engine_options = {}
+if database_url.get_backend_name() == "postgresql":
+    engine_options["connect_args"] = {"options": "-c timezone=utc"}
+if database_url.get_driver_name() == "psycopg2":
+    # Multi-row VALUES for inserts, execute_batch for other executemany
+    engine_options["executemany_mode"] = "values_plus_batch"
 engine = create_engine(
-    settings.database_url,
-    pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20
+    database_url,
+    pool_pre_ping=settings.db_pool_pre_ping,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_recycle=settings.db_pool_recycle_seconds,
+    pool_timeout=30,
+    insertmanyvalues_page_size=1000,
+    **engine_options
 )
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Per-request session scope, set by DBSessionMiddleware. Context variables are
+# copied into the threadpool worker that runs each sync handler, so every
+# dependency and handler for one request sees the same session.
+request_scope: ContextVar[Optional[object]] = ContextVar("db_request_scope", default=None)
+
+
+def _session_scope():
+    """Scope key for the current session: the request, or the thread outside requests."""
+    return request_scope.get() or threading.get_ident()
+
+
+# Create session registry (one session per request, released by middleware)
+SessionLocal = scoped_session(
+    sessionmaker(autocommit=False, autoflush=False, bind=engine),
+    scopefunc=_session_scope
+)
 
 # Base class for models
 Base = declarative_base()
 
 
-def get_db():
-    """Dependency for getting database session."""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+def get_db() -> Session:
+    """Dependency for getting the current request's database session."""
+    return SessionLocal()
 
 
 
@@ -0,0 +1,87 @@
+"""Idempotent schema upgrades for existing databases."""
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from app.database.base import Base
+from app.database.models import IS_ANOMALOUS_SQL, MODEL_PERFORMANCE_HISTORY_COLUMNS, TRAFFIC_LOG_CHECKS
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# create_all() only creates missing tables, so columns and indexes added to
+# existing tables are applied here. Every statement is safe to re-run.
+POSTGRES_UPGRADES = [
+    f"ALTER TABLE traffic_logs ADD COLUMN IF NOT EXISTS is_anomalous BOOLEAN "
+    f"GENERATED ALWAYS AS ({IS_ANOMALOUS_SQL}) STORED",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_traffic_logs_timestamp_endpoint "
+    "ON traffic_logs (timestamp, endpoint)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_traffic_logs_anomalous_timestamp "
+    "ON traffic_logs (timestamp) WHERE is_anomalous",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_anomalies_detected_at_id "
+    "ON anomalies (detected_at, id)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_anom_unresolved_time "
+    "ON anomalies (is_resolved, detected_at, id)",
+    "DROP INDEX CONCURRENTLY IF EXISTS ix_anomalies_is_resolved",
+    "DROP INDEX CONCURRENTLY IF EXISTS ix_metrics_ep_window",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_traffic_logs_created_at "
+    "ON traffic_logs (created_at)",
+    "DO $$ BEGIN "
+    "IF EXISTS (SELECT 1 FROM information_schema.columns WHERE table_name = 'anomalies' "
+    "AND column_name = 'features' AND data_type = 'json') THEN "
+    "ALTER TABLE anomalies ALTER COLUMN features TYPE jsonb USING features::jsonb; "
+    "END IF; END $$",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_anomalies_features_gin "
+    "ON anomalies USING gin (features)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_model_perf_eval_covering "
+    "ON model_performance (evaluation_date DESC) "
+    f"INCLUDE ({', '.join(c for c in MODEL_PERFORMANCE_HISTORY_COLUMNS if c != 'evaluation_date')})",
+]
+
+# Check constraints are added NOT VALID: enforced for new rows without
+# scanning (or failing on) rows written before the check existed
+POSTGRES_UPGRADES += [
+    f"DO $$ BEGIN "
+    f"IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = '{name}') THEN "
+    f"ALTER TABLE traffic_logs ADD CONSTRAINT {name} CHECK ({check}) NOT VALID; "
+    f"END IF; END $$"
+    for name, check in TRAFFIC_LOG_CHECKS.items()
+]
+
+
+# Arbitrary key for the advisory lock that serializes concurrent upgrade runs
+_UPGRADE_LOCK_KEY = 0x5ECF10
+
+# Indexes left INVALID by an interrupted CREATE INDEX CONCURRENTLY; IF NOT
+# EXISTS would skip them forever, so they are dropped and built again
+_INVALID_INDEXES_SQL = (
+    "SELECT index_class.relname FROM pg_index "
+    "JOIN pg_class index_class ON index_class.oid = pg_index.indexrelid "
+    "JOIN pg_class table_class ON table_class.oid = pg_index.indrelid "
+    "WHERE NOT pg_index.indisvalid AND table_class.relname = ANY(:tables)"
+)
+
+
+def upgrade_schema(engine: Engine) -> None:
+    """
+    Apply pending schema upgrades (PostgreSQL only).
+    
+    Run from init_db.py as a deploy step, not at application startup: some
+    upgrades rewrite or lock whole tables.
+    """
+    if engine.dialect.name != "postgresql":
+        return
+    
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": _UPGRADE_LOCK_KEY})
+        try:
+            invalid = conn.execute(text(_INVALID_INDEXES_SQL), {"tables": list(Base.metadata.tables)}).scalars().all()
+            for name in invalid:
+                logger.warning(f"Rebuilding invalid index {name}")
+                conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"'))
+            
+            for statement in POSTGRES_UPGRADES:
+                conn.execute(text(statement))
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _UPGRADE_LOCK_KEY})
+    
+    logger.info("Database schema upgrades applied")
@@ -1,8 +1,35 @@
 """Database models for SecuraFlow."""
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, JSON, Index, Computed, CheckConstraint, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database.base import Base
 
+# Ground-truth anomaly predicate, shared by the generated column and schema upgrades
+IS_ANOMALOUS_SQL = (
+    "status_code >= 500 OR response_time_ms > 3000"
+    " OR COALESCE(request_size_bytes, 0) > 10000000"
+    " OR COALESCE(response_size_bytes, 0) > 10000000"
+)
+
+# Value checks on traffic logs, shared by the table definition and schema upgrades
+TRAFFIC_LOG_CHECKS = {
+    "ck_traffic_logs_status_code": "status_code BETWEEN 100 AND 599",
+    "ck_traffic_logs_sizes": (
+        "response_time_ms >= 0"
+        " AND COALESCE(request_size_bytes, 0) >= 0"
+        " AND COALESCE(response_size_bytes, 0) >= 0"
+    ),
+}
+
+# Columns returned by the model metrics history endpoint
+MODEL_PERFORMANCE_HISTORY_COLUMNS = (
+    "id", "model_version", "evaluation_date", "total_predictions",
+    "true_positives", "false_positives", "true_negatives", "false_negatives",
+    "precision", "recall", "f1_score", "accuracy", "auc_roc",
+    "avg_anomaly_score", "threshold_used",
+)
+
 
 class TrafficLog(Base):
     """Raw traffic log entries."""
@@ -19,6 +46,26 @@ class TrafficLog(Base):
     ip_address = Column(String(45))
     user_agent = Column(String(500))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Ground truth used by model evaluation: server error (5xx), very slow
+    # response (>3s), or very large request/response (>10MB)
+    is_anomalous = Column(Boolean, Computed(IS_ANOMALOUS_SQL, persisted=True))
+    
+    __table_args__ = (
+        # Same bounds as the TrafficData schema, enforced for every writer
+        CheckConstraint(TRAFFIC_LOG_CHECKS["ck_traffic_logs_status_code"], name="ck_traffic_logs_status_code"),
+        CheckConstraint(TRAFFIC_LOG_CHECKS["ck_traffic_logs_sizes"], name="ck_traffic_logs_sizes"),
+        # Serves time-range scans grouped/filtered by endpoint (metrics aggregation)
+        Index("ix_traffic_logs_timestamp_endpoint", "timestamp", "endpoint"),
+        # Serves the metrics rollup's scan for recently stored logs
+        Index("ix_traffic_logs_created_at", "created_at"),
+        # Small partial index over just the truly anomalous rows
+        Index(
+            "ix_traffic_logs_anomalous_timestamp",
+            "timestamp",
+            postgresql_where=text("is_anomalous"),
+            sqlite_where=text("is_anomalous")
+        ),
+    )
 
 
 class Metric(Base):
@@ -36,6 +83,34 @@ class Metric(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 
+class MetricRollup1m(Base):
+    """Traffic logs rolled up per minute and endpoint, kept current by upserts."""
+    __tablename__ = "metric_rollup_1m"
+    
+    minute = Column(DateTime(timezone=True), primary_key=True)
+    endpoint = Column(String(255), primary_key=True)
+    request_count = Column(Integer, nullable=False)
+    avg_response_time_ms = Column(Float, nullable=False)
+    error_count = Column(Integer, nullable=False, default=0)
+    p95_response_time_ms = Column(Float)
+    p99_response_time_ms = Column(Float)
+    
+    __table_args__ = (
+        # Serves per-endpoint time-range reads (the primary key serves the rest)
+        Index("ix_metric_rollup_1m_ep_minute", "endpoint", "minute"),
+    )
+
+
+class MetricRollupState(Base):
+    """Progress of the metrics rollup, shared by every API process."""
+    __tablename__ = "metric_rollup_state"
+    
+    id = Column(Integer, primary_key=True)
+    # Traffic logs stored (created_at) before this were rolled up, apart from
+    # late commits still covered by the rollup's trailing safety window
+    watermark = Column(DateTime(timezone=True), nullable=False)
+
+
 class Anomaly(Base):
     """Detected anomalies."""
     __tablename__ = "anomalies"
@@ -45,9 +120,22 @@ class Anomaly(Base):
     traffic_log_id = Column(Integer, ForeignKey("traffic_logs.id"), nullable=True)
     anomaly_score = Column(Float, nullable=False)
     anomaly_type = Column(String(50), nullable=False)
-    features = Column(JSON)
-    is_resolved = Column(Boolean, default=False, index=True)
+    # Binary JSONB on PostgreSQL (parsed once on write, GIN-indexable)
+    features = Column(JSON().with_variant(JSONB(), "postgresql"))
+    is_resolved = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    traffic_log = relationship("TrafficLog")
+    
+    __table_args__ = (
+        # Serves keyset pagination ordered by (detected_at DESC, id DESC)
+        Index("ix_anomalies_detected_at_id", "detected_at", "id"),
+        # Same ordering within the resolved/unresolved filter used by the list
+        # endpoint (also covers lookups on is_resolved alone)
+        Index("ix_anom_unresolved_time", "is_resolved", "detected_at", "id"),
+        # Containment/key lookups on feature values
+        Index("ix_anomalies_features_gin", "features", postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
 
 
 class SystemHealth(Base):
@@ -83,6 +171,16 @@ class ModelPerformance(Base):
     avg_anomaly_score = Column(Float)
     threshold_used = Column(Float)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        # Covering index for the metrics history (newest first), so PostgreSQL
+        # answers it with an index-only scan instead of heap lookups
+        Index(
+            "ix_model_perf_eval_covering",
+            evaluation_date.desc(),
+            postgresql_include=[c for c in MODEL_PERFORMANCE_HISTORY_COLUMNS if c != "evaluation_date"]
+        ).ddl_if(dialect="postgresql"),
+    )
 
 
 class User(Base):
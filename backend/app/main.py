@@ -1,13 +1,19 @@
 """Main FastAPI application."""
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from app.config import settings
+from app.api.dependencies import init_services
 from app.api.routes import traffic, metrics, anomalies, health, demo, model_metrics, auth
 from app.middleware.correlation import CorrelationMiddleware
+from app.middleware.db_session import DBSessionMiddleware
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -15,17 +21,85 @@ logger = get_logger(__name__)
 # Initialize rate limiter (shared instance)
 limiter = Limiter(key_func=get_remote_address)
 
+
+async def run_metrics_rollup(app: FastAPI):
+    """Roll new traffic logs up into metric_rollup_1m every metrics window."""
+    while True:
+        try:
+            await run_in_threadpool(app.state.metrics_rollup.refresh)
+        except Exception as e:
+            logger.error(f"Error rolling up metrics: {e}")
+        await asyncio.sleep(settings.metrics_window_seconds)
+
+
+def warm_up(app: FastAPI):
+    """Warm the database pool and the model before serving traffic."""
+    from sqlalchemy import text
+    from app.database.base import engine
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    app.state.anomaly_detector.warmup()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup and shutdown."""
+    logger.info("SecuraFlow API starting up...")
+    logger.info(f"API Version: {settings.api_version}")
+    
+    # Initialize database tables if they don't exist (schema upgrades for
+    # existing databases run only from init_db.py, never from each worker)
+    if settings.auto_create_tables:
+        try:
+            from app.database.base import Base, engine
+            Base.metadata.create_all(bind=engine)
+            logger.info("Database tables initialized")
+        except Exception as e:
+            logger.error(f"Error initializing database tables: {e}")
+            # Don't fail startup if tables already exist
+    
+    # Load the model and build shared services once per process
+    init_services(app)
+    
+    # Open a database connection and run one prediction so the first
+    # request doesn't pay for connection setup or cold model code paths
+    try:
+        await run_in_threadpool(warm_up, app)
+    except Exception as e:
+        logger.warning(f"Warmup failed: {e}")
+    
+    rollup_task = None
+    if settings.metrics_rollup_enabled:
+        rollup_task = asyncio.create_task(run_metrics_rollup(app))
+    
+    yield
+    
+    logger.info("SecuraFlow API shutting down...")
+    if rollup_task is not None:
+        rollup_task.cancel()
+    app.state.prediction_batcher.close()
+    app.state.traffic_writer.close()
+
+
 # Create FastAPI app
 app = FastAPI(
     title=settings.api_title,
     version=settings.api_version,
-    description="Real-time API monitoring and anomaly detection system"
+    description="Real-time API monitoring and anomaly detection system",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Attach limiter to app state (for use in routes)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
+# Compress larger JSON payloads (metrics lists compress roughly 10:1)
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=4)
+
+# Release each request's scoped database session once the response is ready
+app.add_middleware(DBSessionMiddleware)
+
 # Add correlation ID middleware (should be first to track all requests)
 app.add_middleware(CorrelationMiddleware)
 
@@ -56,26 +130,3 @@ async def root():
         "version": settings.api_version,
         "status": "running"
     }
-
-
-@app.on_event("startup")
-async def startup_event():
-    """Startup event handler."""
-    logger.info("SecuraFlow API starting up...")
-    logger.info(f"API Version: {settings.api_version}")
-    
-    # Initialize database tables if they don't exist
-    try:
-        from app.database.base import Base, engine
-        Base.metadata.create_all(bind=engine)
-        logger.info("Database tables initialized")
-    except Exception as e:
-        logger.error(f"Error initializing database tables: {e}")
-        # Don't fail startup if tables already exist
-
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Shutdown event handler."""
-    logger.info("SecuraFlow API shutting down...")
-
@@ -0,0 +1,23 @@
+"""Middleware that scopes a database session to each request."""
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.database.base import SessionLocal, request_scope
+
+
+class DBSessionMiddleware:
+    """Give each request its own scoped session and release it afterwards."""
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        token = request_scope.set(object())
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            # Closes the session and returns its connection to the pool
+            SessionLocal.remove()
+            request_scope.reset(token)
@@ -1,18 +1,18 @@
 """Pydantic schemas for request/response validation."""
-from pydantic import BaseModel, Field, EmailStr
+from pydantic import BaseModel, ConfigDict, Field, EmailStr
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 
 
 class TrafficData(BaseModel):
     """Schema for incoming traffic data."""
-    endpoint: str = Field(..., description="API endpoint")
-    method: str = Field(..., description="HTTP method")
-    status_code: int = Field(..., description="HTTP status code")
-    response_time_ms: int = Field(..., description="Response time in milliseconds")
-    request_size_bytes: Optional[int] = Field(None, description="Request size in bytes")
-    response_size_bytes: Optional[int] = Field(None, description="Response size in bytes")
-    ip_address: Optional[str] = Field(None, description="Client IP address")
+    endpoint: str = Field(..., max_length=255, description="API endpoint")
+    method: str = Field(..., max_length=10, description="HTTP method")
+    status_code: int = Field(..., ge=100, le=599, description="HTTP status code")
+    response_time_ms: int = Field(..., ge=0, description="Response time in milliseconds")
+    request_size_bytes: Optional[int] = Field(None, ge=0, description="Request size in bytes")
+    response_size_bytes: Optional[int] = Field(None, ge=0, description="Response size in bytes")
+    ip_address: Optional[str] = Field(None, max_length=45, description="Client IP address")
     user_agent: Optional[str] = Field(None, description="User agent string")
     timestamp: Optional[datetime] = Field(None, description="Request timestamp")
 
@@ -25,6 +25,14 @@ class TrafficResponse(BaseModel):
     message: Optional[str] = None
 
 
+class TrafficBatchResponse(BaseModel):
+    """Response for batch traffic ingestion."""
+    success: bool
+    ingested: int
+    anomalies_detected: int
+    results: List[TrafficResponse]
+
+
 class MetricResponse(BaseModel):
     """Schema for metrics response."""
     time_window: datetime
@@ -44,6 +52,8 @@ class MetricsListResponse(BaseModel):
 
 class AnomalyResponse(BaseModel):
     """Schema for anomaly response."""
+    model_config = ConfigDict(from_attributes=True)
+    
     id: int
     detected_at: datetime
     anomaly_score: float
@@ -59,6 +69,7 @@ class AnomaliesListResponse(BaseModel):
     total: int
     limit: int
     offset: int
+    next_cursor: Optional[str] = None
 
 
 class HealthResponse(BaseModel):
@@ -67,6 +78,7 @@ class HealthResponse(BaseModel):
     database: str
     model_loaded: bool
     uptime_seconds: float
+    prediction_cache: Optional[Dict[str, float]] = None
 
 
 class StatsResponse(BaseModel):
@@ -80,6 +92,8 @@ class StatsResponse(BaseModel):
 
 class ModelPerformanceResponse(BaseModel):
     """Model performance metrics response."""
+    model_config = ConfigDict(from_attributes=True)
+    
     id: int
     model_version: str
     evaluation_date: datetime
@@ -112,6 +126,8 @@ class UserCreate(BaseModel):
 
 class UserResponse(BaseModel):
     """Schema for user response."""
+    model_config = ConfigDict(from_attributes=True)
+    
     id: int
     email: str
     username: str
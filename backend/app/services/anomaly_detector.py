@@ -1,12 +1,240 @@
 """ML-based anomaly detection service."""
-import pickle
+import operator
 import os
-from typing import Dict, Any, Optional
+import pickle
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
 from app.config import settings
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Feature order must match training script
+FEATURE_ORDER = (
+    "response_time_ms",
+    "status_code",
+    "request_size_bytes",
+    "response_size_bytes",
+    "hour_of_day",
+    "day_of_week",
+    "minute_of_hour",
+    "is_error",
+    "is_server_error",
+    "is_client_error",
+    "endpoint_length",
+    "method_get",
+    "method_post",
+    "response_to_request_ratio",
+    "throughput_mbps",
+    "is_very_slow",
+    "is_very_large_request",
+    "is_very_large_response",
+)
+
+# Pulls every model feature out of a complete feature dict in one C-level call
+_get_features = operator.itemgetter(*FEATURE_ORDER)
+
+# Rounding steps for continuous features when prediction_cache_quantize is
+# on, as (position in FEATURE_ORDER, step): 10ms, 1KB and two decimals
+_QUANTIZE_STEPS = tuple(
+    (FEATURE_ORDER.index(key), step)
+    for key, step in (
+        ("response_time_ms", 10),
+        ("request_size_bytes", 1024),
+        ("response_size_bytes", 1024),
+        ("response_to_request_ratio", 0.01),
+        ("throughput_mbps", 0.01),
+    )
+)
+
+
+def _feature_values(features: Dict[str, float]) -> Tuple[float, ...]:
+    """Feature values in model's expected order."""
+    try:
+        # FeatureExtractor output always has every model feature
+        return _get_features(features)
+    except KeyError:
+        return tuple([features.get(key, 0.0) for key in FEATURE_ORDER])
+
+
+def _cache_key(row: Tuple[float, ...]) -> Tuple[float, ...]:
+    """
+    Feature row rounded by _QUANTIZE_STEPS.
+    
+    The model scores the rounded row, so a cached score is exact for every
+    request that rounds to the same key.
+    """
+    values = list(row)
+    for i, step in _QUANTIZE_STEPS:
+        values[i] = round(values[i] / step) * step
+    return tuple(values)
+
+
+# Fallback detection rules as (feature, threshold, score, anomaly type), in
+# priority order; the first feature above its threshold decides the result
+_STATISTICAL_RULES = (
+    ("is_server_error", 0, 0.9, "server_error"),  # Server errors (5xx) - clear anomaly
+    ("response_time_ms", 3000, 0.85, "response_time_spike"),  # Very slow (>3000ms) - matches demo data
+    ("request_size_bytes", 10000000, 0.8, "large_request"),  # Very large requests (>10MB)
+    ("response_size_bytes", 10000000, 0.8, "large_response"),  # Very large responses (>10MB)
+    ("response_time_ms", 1000, 0.5, "response_time_spike"),  # Moderately slow (>1000ms)
+    ("is_client_error", 0, 0.3, "client_error"),  # Client errors (4xx)
+)
+
+# Anomaly type rules as (feature, threshold, anomaly type), in priority order
+_CLASSIFICATION_RULES = (
+    ("is_server_error", 0, "server_error"),
+    ("is_client_error", 0, "client_error"),
+    ("response_time_ms", 1000, "response_time_spike"),
+    ("request_size_bytes", 1000000, "large_request"),
+)
+
+# Rule tables as arrays, so a whole batch is matched with one comparison;
+# score/type lookups have an extra trailing entry for rows matching no rule
+_STATISTICAL_INDEXES = np.array([FEATURE_ORDER.index(rule[0]) for rule in _STATISTICAL_RULES])
+_STATISTICAL_THRESHOLDS = np.array([rule[1] for rule in _STATISTICAL_RULES], dtype=np.float64)
+_STATISTICAL_SCORES = np.array([rule[2] for rule in _STATISTICAL_RULES] + [0.0])
+_STATISTICAL_TYPES = np.array([rule[3] for rule in _STATISTICAL_RULES] + ["normal"], dtype=object)
+_CLASSIFICATION_INDEXES = np.array([FEATURE_ORDER.index(rule[0]) for rule in _CLASSIFICATION_RULES])
+_CLASSIFICATION_THRESHOLDS = np.array([rule[1] for rule in _CLASSIFICATION_RULES], dtype=np.float64)
+_CLASSIFICATION_TYPES = np.array([rule[2] for rule in _CLASSIFICATION_RULES] + ["normal"], dtype=object)
+
+
+def _first_match(values: np.ndarray, indexes: np.ndarray, thresholds: np.ndarray) -> np.ndarray:
+    """Position of the first rule each row matches, or len(thresholds) if none."""
+    hits = values[:, indexes] > thresholds
+    first = hits.argmax(axis=1)
+    first[~hits.any(axis=1)] = len(thresholds)
+    return first
+
+
+# Loaded (model, scaler), keyed by both paths and modification times, so
+# detectors in one process share a single copy and a replaced model file is
+# picked up by the next load_model()
+_artifacts: Dict[Tuple[str, float, str, float], Tuple[Any, Any]] = {}
+_artifacts_lock = threading.Lock()
+
+_detector: Optional["AnomalyDetector"] = None
+_detector_lock = threading.Lock()
+
+# Batches smaller than this are scored on the calling thread; below it the
+# per-chunk overhead outweighs the parallel tree traversal
+_PARALLEL_MIN_ROWS = 256
+
+_scoring_pool: Optional[ThreadPoolExecutor] = None
+_scoring_pool_lock = threading.Lock()
+
+
+def _load_artifacts(model_path: str, scaler_path: str) -> Tuple[Any, Any]:
+    """Load the model and scaler, reusing them if the files are unchanged."""
+    key = (model_path, os.path.getmtime(model_path), scaler_path, os.path.getmtime(scaler_path))
+    artifacts = _artifacts.get(key)
+    if artifacts is None:
+        with _artifacts_lock:
+            artifacts = _artifacts.get(key)
+            if artifacts is None:
+                with open(model_path, 'rb') as f:
+                    model = pickle.load(f)
+                with open(scaler_path, 'rb') as f:
+                    scaler = pickle.load(f)
+                artifacts = (model, scaler)
+                _artifacts.clear()
+                _artifacts[key] = artifacts
+    return artifacts
+
+
+@dataclass(slots=True, eq=False)
+class PredictionResult(Mapping):
+    """
+    One prediction result.
+    
+    A slotted object is smaller than the equivalent dict. Fields can also
+    be read by key (prediction["is_anomaly"]), so callers written against
+    the dict results keep working.
+    """
+    anomaly_score: float
+    is_anomaly: bool
+    anomaly_type: str
+    
+    def __getitem__(self, key: str) -> Any:
+        if key not in _PREDICTION_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def __iter__(self):
+        return iter(_PREDICTION_FIELDS)
+    
+    def __len__(self) -> int:
+        return len(_PREDICTION_FIELDS)
+
+
+_PREDICTION_FIELDS = ("anomaly_score", "is_anomaly", "anomaly_type")
+
+
+def _get_scoring_pool(threads: int) -> ThreadPoolExecutor:
+    """Get the shared thread pool for scoring large batches."""
+    global _scoring_pool
+    if _scoring_pool is None:
+        with _scoring_pool_lock:
+            if _scoring_pool is None:
+                _scoring_pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="model-scoring")
+    return _scoring_pool
+
+
+def get_detector() -> "AnomalyDetector":
+    """Get the process-wide anomaly detector, loading the model on first use."""
+    global _detector
+    if _detector is None:
+        with _detector_lock:
+            if _detector is None:
+                _detector = AnomalyDetector()
+    return _detector
+
+
+class _ScoreCache:
+    """Bounded LRU of normalized model scores keyed by the exact feature vector."""
+    
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._scores: "OrderedDict[Tuple[float, ...], float]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: Tuple[float, ...]) -> Optional[float]:
+        with self._lock:
+            score = self._scores.get(key)
+            if score is None:
+                self.misses += 1
+                return None
+            self._scores.move_to_end(key)
+            self.hits += 1
+            return score
+    
+    def put(self, key: Tuple[float, ...], score: float) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._scores[key] = score
+            self._scores.move_to_end(key)
+            if len(self._scores) > self.maxsize:
+                self._scores.popitem(last=False)
+    
+    def stats(self) -> Dict[str, float]:
+        """Size and hit/miss counters, for health reporting."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._scores),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
 
 class AnomalyDetector:
     """Anomaly detection using ML model."""
@@ -14,7 +242,10 @@ class AnomalyDetector:
     def __init__(self):
         self.model = None
         self.scaler = None
+        self._scaler_mean = None
+        self._scaler_scale = None
         self.model_loaded = False
+        self.score_cache = _ScoreCache(settings.prediction_cache_size)
         self.load_model()
     
     def load_model(self) -> bool:
@@ -31,10 +262,10 @@ class AnomalyDetector:
                 scaler_path = os.path.join(os.getcwd(), scaler_path)
             
             if os.path.exists(model_path) and os.path.exists(scaler_path):
-                with open(model_path, 'rb') as f:
-                    self.model = pickle.load(f)
-                with open(scaler_path, 'rb') as f:
-                    self.scaler = pickle.load(f)
+                self.model, self.scaler = _load_artifacts(model_path, scaler_path)
+                self._cache_scaler_coefficients()
+                # Scores from a previous model no longer apply
+                self.score_cache = _ScoreCache(settings.prediction_cache_size)
                 self.model_loaded = True
                 logger.info(f"Model and scaler loaded successfully")
                 return True
@@ -47,7 +278,12 @@ class AnomalyDetector:
             self.model_loaded = False
             return False
     
-    def predict(self, features: Dict[str, float]) -> Dict[str, Any]:
+    def warmup(self) -> None:
+        """Run throwaway predictions so first real requests hit warm code paths."""
+        self.predict({})
+        self.predict_batch([{}, {}])
+    
+    def predict(self, features: Dict[str, float]) -> PredictionResult:
         """
         Predict anomaly score for given features.
         
@@ -55,132 +291,147 @@ class AnomalyDetector:
             features: Dictionary of feature values
         
         Returns:
-            Dictionary with anomaly_score, is_anomaly, and anomaly_type
+            PredictionResult with anomaly_score, is_anomaly, and anomaly_type
+        """
+        # Single predictions are batches of one, so both paths share the
+        # score cache, the vectorized scoring and the statistical fallback
+        return self.predict_batch([features])[0]
+    
+    def predict_batch(self, features_list: List[Dict[str, float]]) -> List[PredictionResult]:
+        """
+        Predict anomaly scores for many feature dicts at once.
+        
+        Stacks all feature vectors not already in the score cache into one
+        (N, F) array so the scaler and Isolation Forest are each called once
+        for the whole batch.
+        
+        Args:
+            features_list: List of feature dictionaries
+        
+        Returns:
+            List of prediction results, in the same order as the input
+        """
+        return self._predict_rows([_feature_values(features) for features in features_list])
+    
+    def predict_array(self, features: np.ndarray) -> List[PredictionResult]:
         """
+        Predict anomaly scores for an (N, F) feature matrix.
+        
+        Args:
+            features: Feature matrix with columns in FEATURE_ORDER, as built by
+                FeatureExtractor.extract_features_batch()
+        
+        Returns:
+            List of prediction results, in row order
+        """
+        return self._predict_rows(list(map(tuple, features.tolist())), features)
+    
+    def _predict_rows(self, rows: List[Tuple[float, ...]], values: Optional[np.ndarray] = None) -> List[PredictionResult]:
+        """Predict for feature rows in FEATURE_ORDER (values is the same rows as a matrix)."""
+        if not rows:
+            return []
+        
+        if values is None:
+            values = np.array(rows, dtype=np.float64)
+        
         if not self.model_loaded or self.model is None:
-            # Fallback to simple statistical detection
-            return self._statistical_detection(features)
+            return self._statistical_detection(values)
         
         try:
-            # Convert features dict to array (model expects specific order)
-            feature_array = self._features_to_array(features)
-            
-            # Scale features using the trained scaler
-            if self.scaler:
-                feature_array_scaled = self.scaler.transform([feature_array])[0]
-            else:
-                feature_array_scaled = feature_array
-            
-            # Get anomaly score from Isolation Forest
-            # decision_function returns: negative for anomalies, positive for normal
-            # Typical range: -0.5 (most anomalous) to 0.5 (most normal)
-            raw_score = self.model.decision_function([feature_array_scaled])[0]
-            
-            # FIXED: Convert to 0-1 range where higher = more anomalous
-            # Isolation Forest: negative = anomaly, positive = normal
-            # We want: -0.5 (most anomalous) -> 1.0, 0.5 (most normal) -> 0.0
-            if raw_score < 0:
-                # It's an anomaly: more negative = higher score
-                # -0.5 -> 1.0, -0.1 -> 0.8
-                normalized_score = 1.0 - (abs(raw_score) * 2)
-            else:
-                # It's normal: more positive = lower score
-                # 0.0 -> 0.5, 0.5 -> 0.0
-                normalized_score = max(0.0, 0.5 - (raw_score * 1.0))
+            keys = [_cache_key(row) for row in rows] if settings.prediction_cache_quantize else rows
+            scores = [self.score_cache.get(key) for key in keys]
+            missing = [i for i, score in enumerate(scores) if score is None]
             
-            # Ensure score is in [0, 1] range
-            normalized_score = max(0.0, min(1.0, normalized_score))
+            if missing:
+                X = np.array([keys[i] for i in missing], dtype=np.float64)
+                
+                if self.scaler:
+                    X = self._scale_features(X)
+                
+                # decision_function returns: negative for anomalies, positive for normal
+                # Typical range: -0.5 (most anomalous) to 0.5 (most normal)
+                raw_scores = self._decision_function(X)
+                
+                # Convert to 0-1 range where higher = more anomalous:
+                # -0.5 -> 1.0, -0.1 -> 0.8, 0.0 -> 0.5, 0.5 -> 0.0
+                normalized_scores = np.where(
+                    raw_scores < 0,
+                    1.0 - (np.abs(raw_scores) * 2),
+                    np.maximum(0.0, 0.5 - raw_scores)
+                ).clip(0.0, 1.0)
+                
+                for i, score in zip(missing, normalized_scores.tolist()):
+                    scores[i] = score
+                    self.score_cache.put(keys[i], score)
             
-            # Use threshold to determine if it's an anomaly
-            # Higher threshold = fewer false positives, better precision
-            is_anomaly = normalized_score >= settings.anomaly_threshold
-            
-            # Determine anomaly type
-            anomaly_type = self._classify_anomaly_type(features, normalized_score)
-            
-            return {
-                "anomaly_score": float(normalized_score),
-                "is_anomaly": is_anomaly,
-                "anomaly_type": anomaly_type
-            }
+            anomaly_types = self._classify_anomaly_types(values, np.array(scores))
+            threshold = settings.anomaly_threshold
+            return [
+                PredictionResult(score, score >= threshold, anomaly_type)
+                for score, anomaly_type in zip(scores, anomaly_types)
+            ]
         except Exception as e:
-            logger.error(f"Error in model prediction: {e}")
-            return self._statistical_detection(features)
-    
-    def _features_to_array(self, features: Dict[str, float]) -> list:
-        """Convert features dict to array in model's expected order."""
-        # Feature order must match training script
-        feature_order = [
-            "response_time_ms",
-            "status_code",
-            "request_size_bytes",
-            "response_size_bytes",
-            "hour_of_day",
-            "day_of_week",
-            "minute_of_hour",
-            "is_error",
-            "is_server_error",
-            "is_client_error",
-            "endpoint_length",
-            "method_get",
-            "method_post",
-            "response_to_request_ratio",
-            "throughput_mbps",
-            "is_very_slow",
-            "is_very_large_request",
-            "is_very_large_response",
-        ]
+            logger.error("Error in batch model prediction: %s", e)
+            return self._statistical_detection(values)
+    
+    def _decision_function(self, X: np.ndarray) -> np.ndarray:
+        """
+        Isolation Forest decision_function, split across threads for large batches.
         
-        return [features.get(key, 0.0) for key in feature_order]
+        The pinned scikit-learn scores every tree serially regardless of the
+        model's n_jobs, but its tree traversal releases the GIL, so scoring
+        row chunks on separate threads runs in parallel. Rows are scored
+        independently, so the result is identical to a single call.
+        """
+        threads = min(settings.prediction_scoring_threads, os.cpu_count() or 1)
+        if threads <= 1 or len(X) < _PARALLEL_MIN_ROWS:
+            return self.model.decision_function(X)
+        
+        chunks = np.array_split(X, min(threads, len(X) // (_PARALLEL_MIN_ROWS // 2)))
+        return np.concatenate(list(_get_scoring_pool(threads).map(self.model.decision_function, chunks)))
+    
+    def _cache_scaler_coefficients(self) -> None:
+        """Keep the StandardScaler's mean/scale so scaling can skip sklearn's transform()."""
+        self._scaler_mean = None
+        self._scaler_scale = None
+        if isinstance(self.scaler, dict):
+            # Saved by training as plain {"mean", "scale"} arrays
+            self._scaler_mean = np.asarray(self.scaler["mean"], dtype=np.float64)
+            self._scaler_scale = np.asarray(self.scaler["scale"], dtype=np.float64)
+        elif hasattr(self.scaler, "mean_") and hasattr(self.scaler, "scale_"):
+            if getattr(self.scaler, "with_mean", True):
+                self._scaler_mean = np.asarray(self.scaler.mean_, dtype=np.float64)
+            if getattr(self.scaler, "with_std", True):
+                self._scaler_scale = np.asarray(self.scaler.scale_, dtype=np.float64)
     
-    def _statistical_detection(self, features: Dict[str, float]) -> Dict[str, Any]:
+    def _scale_features(self, X: np.ndarray) -> np.ndarray:
+        """Standardize a float64 feature array in place, as scaler.transform() would."""
+        if self._scaler_mean is None and self._scaler_scale is None:
+            return self.scaler.transform(X, copy=False)
+        if self._scaler_mean is not None:
+            np.subtract(X, self._scaler_mean, out=X)
+        if self._scaler_scale is not None:
+            np.divide(X, self._scaler_scale, out=X)
+        return X
+    
+    def _statistical_detection(self, values: np.ndarray) -> List[PredictionResult]:
         """Fallback statistical anomaly detection - matches demo data patterns."""
-        score = 0.0
-        anomaly_type = "normal"
-        
-        # Check for server errors (5xx) - highest priority, clear anomaly
-        if features.get("is_server_error", 0) > 0:
-            score = 0.9  # High score for server errors
-            anomaly_type = "server_error"
-        # Check for very slow responses (>3000ms) - matches demo data
-        elif features.get("response_time_ms", 0) > 3000:
-            score = 0.85  # High score for very slow
-            anomaly_type = "response_time_spike"
-        # Check for very large requests (>10MB) - matches demo data
-        elif features.get("request_size_bytes", 0) > 10000000:
-            score = 0.8  # High score for very large requests
-            anomaly_type = "large_request"
-        # Check for very large responses (>10MB) - matches demo data
-        elif features.get("response_size_bytes", 0) > 10000000:
-            score = 0.8  # High score for very large responses
-            anomaly_type = "large_response"
-        # Check for moderately slow responses (>1000ms)
-        elif features.get("response_time_ms", 0) > 1000:
-            score = 0.5
-            anomaly_type = "response_time_spike"
-        # Check for client errors (4xx)
-        elif features.get("is_client_error", 0) > 0:
-            score = 0.3
-            anomaly_type = "client_error"
+        # First matching rule wins (rules are in priority order)
+        matched = _first_match(values, _STATISTICAL_INDEXES, _STATISTICAL_THRESHOLDS)
+        scores = np.minimum(_STATISTICAL_SCORES[matched], 1.0)
         
-        return {
-            "anomaly_score": min(score, 1.0),
-            "is_anomaly": score >= settings.anomaly_threshold,
-            "anomaly_type": anomaly_type
-        }
+        threshold = settings.anomaly_threshold
+        return [
+            PredictionResult(score, score >= threshold, anomaly_type)
+            for score, anomaly_type in zip(scores.tolist(), _STATISTICAL_TYPES[matched].tolist())
+        ]
     
-    def _classify_anomaly_type(self, features: Dict[str, float], score: float) -> str:
-        """Classify the type of anomaly based on features."""
-        if features.get("is_server_error", 0) > 0:
-            return "server_error"
-        elif features.get("is_client_error", 0) > 0:
-            return "client_error"
-        elif features.get("response_time_ms", 0) > 1000:
-            return "response_time_spike"
-        elif features.get("request_size_bytes", 0) > 1000000:
-            return "large_request"
-        elif score >= settings.anomaly_threshold:
-            return "pattern_anomaly"
-        else:
-            return "normal"
-
+    def _classify_anomaly_types(self, values: np.ndarray, scores: np.ndarray) -> List[str]:
+        """Classify the type of anomaly for each row based on features."""
+        matched = _first_match(values, _CLASSIFICATION_INDEXES, _CLASSIFICATION_THRESHOLDS)
+        anomaly_types = _CLASSIFICATION_TYPES[matched]
+        
+        # Rows no rule matched are pattern anomalies if the model flagged them
+        unmatched = matched == len(_CLASSIFICATION_RULES)
+        anomaly_types[unmatched & (scores >= settings.anomaly_threshold)] = "pattern_anomaly"
+        return anomaly_types.tolist()
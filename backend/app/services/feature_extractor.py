@@ -1,7 +1,9 @@
 """Feature extraction service for traffic data."""
-from typing import Dict, Any
+from typing import Dict, Any, List
 from datetime import datetime
+import numpy as np
 from app.models.schemas import TrafficData
+from app.services.anomaly_detector import FEATURE_ORDER
 
 
 class FeatureExtractor:
@@ -67,4 +69,75 @@ class FeatureExtractor:
             })
         
         return features
-
+    
+    @staticmethod
+    def extract_features_batch(traffic_list: List[TrafficData]) -> np.ndarray:
+        """
+        Extract model features for many traffic records at once.
+        
+        Reads each field into a column array and derives every feature with
+        vectorized arithmetic, instead of building a dict per record. Values
+        match extract_features() without context.
+        
+        Args:
+            traffic_list: Traffic data to extract features from
+        
+        Returns:
+            (N, F) float64 matrix with columns in FEATURE_ORDER
+        """
+        n = len(traffic_list)
+        now = datetime.now()
+        
+        # Wall-clock minutes since the epoch, converted by NumPy in one pass;
+        # time features use each timestamp's own wall clock, as in
+        # extract_features(), so any tzinfo is dropped rather than applied
+        minutes = np.array(
+            [(t.timestamp or now).replace(tzinfo=None) for t in traffic_list],
+            dtype="datetime64[m]"
+        ).astype(np.int64)
+        methods = [traffic_data.method.upper() for traffic_data in traffic_list]
+        
+        # Base columns
+        response_time = np.fromiter((t.response_time_ms for t in traffic_list), dtype=np.float64, count=n)
+        status_code = np.fromiter((t.status_code for t in traffic_list), dtype=np.float64, count=n)
+        request_size = np.fromiter((t.request_size_bytes or 0 for t in traffic_list), dtype=np.float64, count=n)
+        response_size = np.fromiter((t.response_size_bytes or 0 for t in traffic_list), dtype=np.float64, count=n)
+        
+        columns = {
+            # Basic features
+            "response_time_ms": response_time,
+            "status_code": status_code,
+            "request_size_bytes": request_size,
+            "response_size_bytes": response_size,
+            
+            # Time-based features
+            "hour_of_day": minutes // 60 % 24,
+            "day_of_week": (minutes // 1440 + 3) % 7,  # The epoch was a Thursday (Monday = 0)
+            "minute_of_hour": minutes % 60,
+            
+            # Status code features
+            "is_error": status_code >= 400,
+            "is_server_error": status_code >= 500,
+            "is_client_error": (status_code >= 400) & (status_code < 500),
+            
+            # Endpoint features
+            "endpoint_length": np.fromiter((len(t.endpoint) for t in traffic_list), dtype=np.float64, count=n),
+            "method_get": np.fromiter((method == "GET" for method in methods), dtype=np.float64, count=n),
+            "method_post": np.fromiter((method == "POST" for method in methods), dtype=np.float64, count=n),
+            
+            # Derived features
+            "response_to_request_ratio": response_size / np.maximum(request_size, 1),
+            "throughput_mbps": np.where(
+                response_time > 0,
+                (response_size * 8) / (np.maximum(response_time, 1) * 1000),
+                0.0
+            ),
+            "is_very_slow": response_time > 3000,
+            "is_very_large_request": request_size > 10000000,
+            "is_very_large_response": response_size > 10000000,
+        }
+        
+        features = np.empty((n, len(FEATURE_ORDER)), dtype=np.float64)
+        for i, key in enumerate(FEATURE_ORDER):
+            features[:, i] = columns[key]
+        return features
@@ -0,0 +1,259 @@
+"""Aggregation of raw traffic logs into 1-minute metrics."""
+from datetime import date, datetime, timezone
+from typing import List, Optional, Tuple
+import numpy as np
+from sqlalchemy import ColumnElement, func, select, case, desc, cast, or_, Integer
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database.models import TrafficLog
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Minutes from 0001-01-01 to the Unix epoch, for bucketing by date fields
+_EPOCH_MINUTE = date(1970, 1, 1).toordinal() * 1440
+
+
+def aggregate_metrics(
+    db: Session,
+    start_time: datetime,
+    end_time: datetime,
+    endpoint: Optional[str] = None
+) -> List[dict]:
+    """
+    Aggregate traffic logs in [start_time, end_time] into 1-minute metrics.
+    
+    On PostgreSQL and SQLite the aggregation (including p95/p99) runs
+    server-side in a single query; other databases fall back to NumPy.
+    
+    Returns:
+        Metric dicts in the MetricResponse shape, newest time window first
+    """
+    return _aggregate(db, TrafficLog.timestamp.between(start_time, end_time), endpoint)
+
+
+def aggregate_metric_ranges(db: Session, ranges: List[Tuple[datetime, datetime]]) -> List[dict]:
+    """
+    Aggregate traffic logs in several [start, end] timestamp ranges at once.
+    
+    Each range is an indexed timestamp scan, so only the given minutes are
+    read however far apart they are. Keep the number of ranges modest (SQLite
+    limits expression depth to 1000).
+    
+    Returns:
+        Metric dicts in the MetricResponse shape, newest time window first
+    """
+    if not ranges:
+        return []
+    return _aggregate(db, or_(*(TrafficLog.timestamp.between(start, end) for start, end in ranges)), None)
+
+
+def _aggregate(db: Session, time_filter: ColumnElement[bool], endpoint: Optional[str]) -> List[dict]:
+    """Aggregate logs matching time_filter with the best method the database supports."""
+    dialect = db.get_bind().dialect.name
+    if settings.metrics_sql_aggregation and dialect == "postgresql":
+        return _aggregate_in_sql(db, time_filter, endpoint)
+    if settings.metrics_sql_aggregation and dialect == "sqlite":
+        return _aggregate_in_sql_ranked(db, time_filter, endpoint)
+    return _aggregate_in_python(db, time_filter, endpoint)
+
+
+def _aggregate_in_sql(
+    db: Session,
+    time_filter: ColumnElement[bool],
+    endpoint: Optional[str]
+) -> List[dict]:
+    """Aggregate 1-minute metrics server-side with GROUP BY (PostgreSQL)."""
+    time_window = func.date_trunc('minute', TrafficLog.timestamp).label('time_window')
+    stmt = select(
+        time_window,
+        TrafficLog.endpoint,
+        func.count().label('request_count'),
+        func.avg(TrafficLog.response_time_ms).label('avg_response_time_ms'),
+        func.sum(case((TrafficLog.status_code >= 400, 1), else_=0)).label('error_count'),
+        func.percentile_cont(0.95).within_group(TrafficLog.response_time_ms.asc()).label('p95'),
+        func.percentile_cont(0.99).within_group(TrafficLog.response_time_ms.asc()).label('p99'),
+    ).where(
+        time_filter
+    )
+    
+    if endpoint:
+        stmt = stmt.where(TrafficLog.endpoint == endpoint)
+    
+    stmt = stmt.group_by(time_window, TrafficLog.endpoint).order_by(desc('time_window'))
+    
+    return [
+        dict(
+            time_window=row.time_window,
+            endpoint=row.endpoint,
+            request_count=row.request_count,
+            avg_response_time_ms=float(row.avg_response_time_ms),
+            error_count=row.error_count,
+            p95_response_time_ms=row.p95,
+            p99_response_time_ms=row.p99
+        )
+        for row in db.execute(stmt)
+    ]
+
+
+def _aggregate_in_sql_ranked(
+    db: Session,
+    time_filter: ColumnElement[bool],
+    endpoint: Optional[str]
+) -> List[dict]:
+    """Aggregate 1-minute metrics server-side with window functions (SQLite)."""
+    # SQLite has no percentile_cont, so rank response times within each
+    # (minute, endpoint) group and interpolate between the two ranks around
+    # each percentile, the same way percentile_cont does on PostgreSQL
+    bucket = func.strftime('%Y-%m-%d %H:%M:00', TrafficLog.timestamp)
+    partition = (bucket, TrafficLog.endpoint)
+    ranked = select(
+        bucket.label('time_window'),
+        TrafficLog.endpoint,
+        TrafficLog.response_time_ms,
+        TrafficLog.status_code,
+        func.row_number().over(partition_by=partition, order_by=TrafficLog.response_time_ms).label('response_rank'),
+        func.count().over(partition_by=partition).label('group_size'),
+    ).where(
+        time_filter
+    )
+    
+    if endpoint:
+        ranked = ranked.where(TrafficLog.endpoint == endpoint)
+    
+    ranked = ranked.subquery()
+    
+    def percentile(q: float):
+        # Linear interpolation at position (n - 1) * q (rank is 1-based)
+        position = (ranked.c.group_size - 1) * q
+        lower_rank = cast(position, Integer) + 1
+        lower = func.max(case((ranked.c.response_rank == lower_rank, ranked.c.response_time_ms)))
+        upper = func.max(case((ranked.c.response_rank == lower_rank + 1, ranked.c.response_time_ms)))
+        fraction = func.max(position - cast(position, Integer))
+        return lower + fraction * (func.coalesce(upper, lower) - lower)
+    
+    stmt = select(
+        ranked.c.time_window,
+        ranked.c.endpoint,
+        func.count().label('request_count'),
+        func.avg(ranked.c.response_time_ms).label('avg_response_time_ms'),
+        func.sum(case((ranked.c.status_code >= 400, 1), else_=0)).label('error_count'),
+        percentile(0.95).label('p95'),
+        percentile(0.99).label('p99'),
+    ).group_by(ranked.c.time_window, ranked.c.endpoint).order_by(desc(ranked.c.time_window))
+    
+    return [
+        dict(
+            time_window=datetime.strptime(row.time_window, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc),
+            endpoint=row.endpoint,
+            request_count=row.request_count,
+            avg_response_time_ms=float(row.avg_response_time_ms),
+            error_count=row.error_count,
+            p95_response_time_ms=row.p95,
+            p99_response_time_ms=row.p99
+        )
+        for row in db.execute(stmt)
+    ]
+
+
+def _aggregate_in_python(
+    db: Session,
+    time_filter: ColumnElement[bool],
+    endpoint: Optional[str]
+) -> List[dict]:
+    """Aggregate 1-minute metrics with NumPy (fallback for databases without SQL aggregation)."""
+    # Query only the columns needed for aggregation
+    stmt = select(
+        TrafficLog.timestamp,
+        TrafficLog.endpoint,
+        TrafficLog.response_time_ms,
+        TrafficLog.status_code
+    ).where(
+        time_filter
+    )
+    
+    if endpoint:
+        stmt = stmt.where(TrafficLog.endpoint == endpoint)
+    
+    # Single streaming pass: rows arrive in chunks and are reduced straight
+    # into compact per-column NumPy buffers (minute, endpoint code, response
+    # time, error flag) - no Row objects or endpoint strings are kept
+    endpoint_codes_by_name = {}
+    minute_chunks, endpoint_code_chunks, response_time_chunks, error_chunks = [], [], [], []
+    for partition in db.execute(stmt.execution_options(yield_per=2000)).partitions():
+        timestamps, endpoints, response_times, status_codes = zip(*partition)
+        # Aggregate by time window (1 minute windows). Timestamps are UTC wall
+        # clock on every backend (see database.base), so the epoch minute comes
+        # straight from the date fields without building new datetimes
+        minute_chunks.append(np.fromiter(
+            (ts.toordinal() * 1440 + ts.hour * 60 + ts.minute - _EPOCH_MINUTE for ts in timestamps),
+            dtype=np.int32,
+            count=len(timestamps)
+        ))
+        endpoint_code_chunks.append(np.fromiter(
+            (endpoint_codes_by_name.setdefault(name, len(endpoint_codes_by_name)) for name in endpoints),
+            dtype=np.int32,
+            count=len(endpoints)
+        ))
+        response_time_chunks.append(np.asarray(response_times, dtype=np.int32))
+        error_chunks.append(np.asarray(status_codes) >= 400)
+    
+    row_count = sum(len(chunk) for chunk in minute_chunks)
+    logger.info("Found %d traffic logs to aggregate", row_count)
+    
+    # If no logs, return empty
+    if row_count == 0:
+        return []
+    
+    response_times = np.concatenate(response_time_chunks)
+    is_error = np.concatenate(error_chunks)
+    
+    # Group by (time_window, endpoint) encoded as one integer key; with an
+    # endpoint filter there is a single endpoint, so this is time_window only
+    endpoint_names = np.array(list(endpoint_codes_by_name), dtype=object)
+    keys = np.concatenate(minute_chunks).astype(np.int64) * len(endpoint_names) + np.concatenate(endpoint_code_chunks)
+    group_keys, group_ids = np.unique(keys, return_inverse=True)
+    
+    request_counts = np.bincount(group_ids)
+    response_time_sums = np.bincount(group_ids, weights=response_times)
+    error_counts = np.bincount(group_ids, weights=is_error)
+    
+    # Sort response times within each group once, then compute p95/p99 for
+    # every group at the same time with linear interpolation (the definition
+    # used by np.percentile and PostgreSQL's percentile_cont)
+    sorted_times = response_times[np.lexsort((response_times, group_ids))].astype(np.float64)
+    group_starts = np.cumsum(request_counts) - request_counts
+    p95 = _grouped_percentile(sorted_times, group_starts, request_counts, 0.95)
+    p99 = _grouped_percentile(sorted_times, group_starts, request_counts, 0.99)
+    
+    group_minutes = group_keys // len(endpoint_names)
+    group_endpoints = endpoint_names[group_keys % len(endpoint_names)]
+    
+    # Newest time window first
+    return [
+        dict(
+            time_window=datetime.fromtimestamp(int(group_minutes[i]) * 60, tz=timezone.utc),
+            endpoint=endpoint if endpoint else group_endpoints[i],
+            request_count=int(request_counts[i]),
+            avg_response_time_ms=float(response_time_sums[i] / request_counts[i]),
+            error_count=int(error_counts[i]),
+            p95_response_time_ms=float(p95[i]),
+            p99_response_time_ms=float(p99[i])
+        )
+        for i in np.argsort(-group_minutes, kind='stable').tolist()
+    ]
+
+
+def _grouped_percentile(
+    sorted_values: np.ndarray,
+    group_starts: np.ndarray,
+    group_sizes: np.ndarray,
+    q: float
+) -> np.ndarray:
+    """Linearly interpolated q-quantile of each group in a group-sorted array."""
+    position = (group_sizes - 1) * q
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, group_sizes - 1)
+    lower_values = sorted_values[group_starts + lower]
+    upper_values = sorted_values[group_starts + upper]
+    return lower_values + (position - lower) * (upper_values - lower_values)
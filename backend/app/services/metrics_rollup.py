@@ -0,0 +1,211 @@
+"""Incremental rollup of traffic logs into the metric_rollup_1m table."""
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from sqlalchemy import desc, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database.base import SessionLocal
+from app.database.models import MetricRollup1m, MetricRollupState, TrafficLog
+from app.services.metrics_aggregator import aggregate_metric_ranges, aggregate_metrics
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_STATE_ID = 1
+
+# The first run seeds the table one chunk of log timestamps per transaction
+_SEED_CHUNK = timedelta(hours=6)
+
+# Incremental runs read touched minutes as timestamp ranges of at most
+# _MAX_RANGE, OR-ed together up to _MAX_RANGES_PER_QUERY per query
+_MAX_RANGE = timedelta(hours=1)
+_MAX_RANGES_PER_QUERY = 100
+
+_METRIC_VALUE_COLUMNS = (
+    "request_count",
+    "avg_response_time_ms",
+    "error_count",
+    "p95_response_time_ms",
+    "p99_response_time_ms",
+)
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE
+_UPSERT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+class MetricsRollup:
+    """
+    Keeps the metric_rollup_1m table up to date from new traffic logs.
+    
+    The rollup's watermark is persisted in metric_rollup_state and keyed on
+    TrafficLog.created_at. Each refresh re-aggregates only the distinct
+    minutes touched by logs stored since the watermark minus
+    metrics_rollup_lag_seconds, so logs from transactions that committed late
+    are still picked up and an old ingested timestamp costs one extra minute,
+    not a scan of everything since. Rows are upserted on (minute, endpoint),
+    which makes overlapping refreshes (and several API processes) safe.
+    Reads are served from the table once this process has completed a
+    refresh, so they trail new logs by up to one metrics_window_seconds.
+    """
+    
+    def __init__(self):
+        self.ready = False
+        self._lock = threading.Lock()
+    
+    def refresh(self) -> int:
+        """Roll up new traffic logs in a session of its own."""
+        db = SessionLocal.session_factory()
+        try:
+            return self.run_once(db)
+        finally:
+            db.close()
+    
+    def run_once(self, db: Session) -> int:
+        """
+        Roll up traffic logs stored since the watermark (minus the safety lag).
+        
+        The first run, with no watermark yet, seeds the table from every
+        stored log in chunks of _SEED_CHUNK.
+        
+        Returns:
+            Number of rollup rows written
+        """
+        with self._lock:
+            # Database clock, the same one that sets TrafficLog.created_at
+            now = db.execute(select(func.now())).scalar()
+            state = db.get(MetricRollupState, _STATE_ID)
+            
+            if state is None:
+                written = _seed(db)
+            else:
+                since = state.watermark - timedelta(seconds=settings.metrics_rollup_lag_seconds)
+                written = _roll_up_minutes(db, _touched_minutes(db, since))
+            
+            _upsert(db, MetricRollupState, [{"id": _STATE_ID, "watermark": now}], ("id",), ("watermark",))
+            db.commit()
+            
+            logger.info("Rolled up traffic logs stored before %s into %d metrics", now, written)
+            self.ready = True
+            return written
+
+
+def _seed(db: Session) -> int:
+    """Roll up every stored log, committing one _SEED_CHUNK of timestamps at a time."""
+    written = 0
+    oldest = db.execute(select(func.min(TrafficLog.timestamp))).scalar()
+    while oldest is not None:
+        start = _floor_minute(oldest)
+        end = start + _SEED_CHUNK
+        rows = aggregate_metrics(db, start, end - timedelta(microseconds=1))
+        written += _upsert_metrics(db, rows)
+        db.commit()
+        # Skip straight to the next stored log, however far ahead it is
+        oldest = db.execute(select(func.min(TrafficLog.timestamp)).where(TrafficLog.timestamp >= end)).scalar()
+    return written
+
+
+def _roll_up_minutes(db: Session, minutes: List[datetime]) -> int:
+    """Re-aggregate the given minutes, as runs of consecutive minutes."""
+    ranges = []
+    for minute in minutes:
+        if ranges and minute == ranges[-1][1] and minute - ranges[-1][0] < _MAX_RANGE:
+            ranges[-1][1] = minute + timedelta(minutes=1)
+        else:
+            ranges.append([minute, minute + timedelta(minutes=1)])
+    
+    written = 0
+    for i in range(0, len(ranges), _MAX_RANGES_PER_QUERY):
+        rows = aggregate_metric_ranges(
+            db,
+            [(start, end - timedelta(microseconds=1)) for start, end in ranges[i:i + _MAX_RANGES_PER_QUERY]]
+        )
+        written += _upsert_metrics(db, rows)
+    return written
+
+
+def _floor_minute(timestamp: datetime) -> datetime:
+    """Start of the timestamp's minute, as UTC (SQLite returns naive UTC datetimes)."""
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.replace(second=0, microsecond=0)
+
+
+def _touched_minutes(db: Session, since: datetime) -> List[datetime]:
+    """Distinct minutes of the traffic logs stored (created_at) since a time, oldest first."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        bucket = func.date_trunc('minute', TrafficLog.timestamp)
+    elif dialect == "sqlite":
+        bucket = func.strftime('%Y-%m-%d %H:%M:00', TrafficLog.timestamp)
+    else:
+        bucket = TrafficLog.timestamp
+    
+    minutes = set()
+    for value in db.execute(select(bucket).where(TrafficLog.created_at >= since).distinct()).scalars():
+        if isinstance(value, str):
+            value = datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+        minutes.add(_floor_minute(value))
+    return sorted(minutes)
+
+
+def _upsert_metrics(db: Session, rows: List[dict]) -> int:
+    """Upsert aggregated metric dicts into metric_rollup_1m."""
+    for row in rows:
+        row["minute"] = row.pop("time_window")
+    _upsert(db, MetricRollup1m, rows, ("minute", "endpoint"), _METRIC_VALUE_COLUMNS)
+    return len(rows)
+
+
+def _upsert(db: Session, model, rows: List[dict], keys: tuple, values: tuple):
+    """Insert rows, updating the value columns of rows whose keys already exist."""
+    if not rows:
+        return
+    
+    insert = _UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    if insert is None:
+        # No ON CONFLICT support; merge() looks up each row by primary key
+        for row in rows:
+            db.merge(model(**row))
+        return
+    
+    stmt = insert(model)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={column: stmt.excluded[column] for column in values}
+    )
+    db.execute(stmt, rows)
+
+
+def read_metrics(
+    db: Session,
+    start_time: datetime,
+    end_time: datetime,
+    endpoint: Optional[str] = None
+) -> List[dict]:
+    """Read rolled-up 1-minute metrics, newest time window first."""
+    stmt = select(
+        MetricRollup1m.minute.label("time_window"),
+        MetricRollup1m.endpoint,
+        *(getattr(MetricRollup1m, column) for column in _METRIC_VALUE_COLUMNS)
+    ).where(
+        MetricRollup1m.minute.between(start_time.replace(second=0, microsecond=0), end_time)
+    )
+    
+    if endpoint:
+        stmt = stmt.where(MetricRollup1m.endpoint == endpoint)
+    
+    stmt = stmt.order_by(desc(MetricRollup1m.minute))
+    
+    metrics = []
+    for row in db.execute(stmt).mappings():
+        metric = dict(row)
+        # SQLite returns naive datetimes; stored minutes are UTC
+        if metric["time_window"].tzinfo is None:
+            metric["time_window"] = metric["time_window"].replace(tzinfo=timezone.utc)
+        metrics.append(metric)
+    return metrics
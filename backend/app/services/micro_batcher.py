@@ -0,0 +1,103 @@
+"""Coalescing of work submitted by concurrent requests into batches."""
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from typing import Any, List, Optional, Tuple
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class MicroBatcher(ABC):
+    """
+    Collects items from concurrent callers and processes them as one batch.
+    
+    Request handlers run in FastAPI's threadpool, so each caller blocks on a
+    Future while a single worker thread waits up to max_wait_ms for more
+    items (or until max_batch_size is reached), then hands the whole batch
+    to _process_batch() and fans the results back out.
+    """
+    
+    def __init__(self, max_batch_size: int = 64, max_wait_ms: float = 5.0, name: str = "micro-batcher"):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+        self._queue: "queue.Queue[Optional[Tuple[Any, Future]]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+    
+    def submit(self, item: Any) -> Any:
+        """Add an item to the next batch and wait for its result."""
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((item, future))
+        return future.result()
+    
+    def close(self) -> None:
+        """Stop the worker thread after it finishes the current batch."""
+        with self._lock:
+            if self._worker is not None:
+                self._queue.put(None)
+                self._worker.join()
+                self._worker = None
+    
+    @abstractmethod
+    def _process_batch(self, items: List[Any]) -> List[Any]:
+        """
+        Process a batch of items, returning one result per item in order.
+        
+        An exception returned in place of a result is raised to that item's
+        caller only; an exception raised here fails the whole batch.
+        """
+    
+    def _ensure_worker(self) -> None:
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+                    self._worker.start()
+    
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            
+            batch, stop = self._collect_batch(item)
+            self._complete(batch)
+            if stop:
+                return
+    
+    def _collect_batch(self, first: Tuple[Any, Future]) -> Tuple[List[Tuple[Any, Future]], bool]:
+        """Gather more items until the batch is full or the wait window closes."""
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+    
+    def _complete(self, batch: List[Tuple[Any, Future]]) -> None:
+        try:
+            results = self._process_batch([item for item, _ in batch])
+        except Exception as e:
+            logger.error(f"Error processing {self.name} batch: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        
+        for (_, future), result in zip(batch, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
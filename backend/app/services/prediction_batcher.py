@@ -0,0 +1,21 @@
+"""Micro-batching of anomaly predictions across concurrent requests."""
+from typing import Dict, List
+from app.services.anomaly_detector import AnomalyDetector, PredictionResult
+from app.services.micro_batcher import MicroBatcher
+
+
+class PredictionBatcher(MicroBatcher):
+    """Scores predictions from concurrent requests with one predict_batch() call."""
+    
+    def __init__(self, detector: AnomalyDetector, max_batch_size: int = 128, max_wait_ms: float = 2.0):
+        super().__init__(max_batch_size, max_wait_ms, name="prediction-batcher")
+        self.detector = detector
+    
+    def predict(self, features: Dict[str, float]) -> PredictionResult:
+        """Predict for one feature dict, batched with any concurrent callers."""
+        if self.max_batch_size <= 1:
+            return self.detector.predict(features)
+        return self.submit(features)
+    
+    def _process_batch(self, items: List[Dict[str, float]]) -> List[PredictionResult]:
+        return self.detector.predict_batch(items)
@@ -0,0 +1,104 @@
+"""Bulk storage of traffic logs and their detected anomalies."""
+from typing import Any, Dict, List, Tuple
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app.database.models import TrafficLog, Anomaly
+from app.models.schemas import TrafficData
+
+# User agents are free-form and can be arbitrarily long; keep what fits
+_USER_AGENT_MAX_LENGTH = TrafficLog.user_agent.type.length
+
+# Statements are built once and reused, so each call only binds parameters
+# (the compiled form is then served from SQLAlchemy's statement cache)
+_INSERT_LOG = insert(TrafficLog).returning(TrafficLog.id)
+_INSERT_LOGS = insert(TrafficLog).returning(TrafficLog.id, sort_by_parameter_order=True)
+_INSERT_ANOMALY = insert(Anomaly)
+
+
+def _log_row(traffic_data: TrafficData) -> Dict[str, Any]:
+    """Column values for one traffic log."""
+    return {
+        "timestamp": traffic_data.timestamp,
+        "endpoint": traffic_data.endpoint,
+        "method": traffic_data.method,
+        "status_code": traffic_data.status_code,
+        "response_time_ms": traffic_data.response_time_ms,
+        "request_size_bytes": traffic_data.request_size_bytes,
+        "response_size_bytes": traffic_data.response_size_bytes,
+        "ip_address": traffic_data.ip_address,
+        "user_agent": traffic_data.user_agent[:_USER_AGENT_MAX_LENGTH] if traffic_data.user_agent else None,
+    }
+
+
+def _anomaly_row(
+    log_id: int,
+    traffic_data: TrafficData,
+    features: Dict[str, float],
+    prediction: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Column values for the anomaly detected on one traffic log."""
+    return {
+        "detected_at": traffic_data.timestamp,
+        "traffic_log_id": log_id,
+        "anomaly_score": prediction["anomaly_score"],
+        "anomaly_type": prediction["anomaly_type"],
+        "features": features,
+        "is_resolved": False,
+    }
+
+
+def store_traffic(
+    db: Session,
+    traffic_data: TrafficData,
+    features: Dict[str, float],
+    prediction: Dict[str, Any]
+) -> int:
+    """
+    Insert one traffic log, plus its anomaly if one was detected.
+    
+    The log ID comes back through RETURNING, so no flush is needed before
+    inserting the anomaly. Does not commit; the caller owns the transaction.
+    
+    Returns:
+        The traffic log ID
+    """
+    log_id = db.execute(_INSERT_LOG, _log_row(traffic_data)).scalar_one()
+    if prediction["is_anomaly"]:
+        db.execute(_INSERT_ANOMALY, [_anomaly_row(log_id, traffic_data, features, prediction)])
+    return log_id
+
+
+def store_traffic_batch(
+    db: Session,
+    traffic_data_list: List[TrafficData],
+    features_list: List[Dict[str, float]],
+    predictions: List[Dict[str, Any]]
+) -> Tuple[List[int], int]:
+    """
+    Insert traffic logs and detected anomalies in two executemany statements.
+    
+    Does not commit; the caller owns the transaction.
+    
+    Returns:
+        (traffic log IDs in input order, number of anomalies stored)
+    """
+    if not traffic_data_list:
+        return [], 0
+    
+    # Store all traffic logs in one executemany, getting the IDs back in
+    # parameter order so they can be paired with their predictions
+    log_ids = db.execute(
+        _INSERT_LOGS,
+        [_log_row(traffic_data) for traffic_data in traffic_data_list]
+    ).scalars().all()
+    
+    # Store detected anomalies in a second executemany
+    anomaly_rows = [
+        _anomaly_row(log_id, traffic_data, features, prediction)
+        for log_id, traffic_data, features, prediction in zip(log_ids, traffic_data_list, features_list, predictions)
+        if prediction["is_anomaly"]
+    ]
+    if anomaly_rows:
+        db.execute(_INSERT_ANOMALY, anomaly_rows)
+    
+    return list(log_ids), len(anomaly_rows)
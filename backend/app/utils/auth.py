@@ -1,5 +1,7 @@
 """Authentication utilities."""
+import time
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
@@ -26,11 +28,22 @@ try:
         # Replace the function
         bcrypt_module.detect_wrap_bug = _safe_detect_wrap_bug
 except (ImportError, AttributeError):
-    # If monkeypatching fails, continue - error handling in get_password_hash will catch issues
+    # If monkeypatching fails, continue with passlib's own bug detection
     pass
 
-# Initialize password context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# HMAC key bytes, encoded once instead of on every encode/decode
+_SECRET_KEY = settings.secret_key.encode('utf-8')
+
+# Only the claims we issue are checked; exp is always re-checked on cache hits
+_DECODE_OPTIONS = {"verify_aud": False, "require_exp": True, "require_sub": True}
+
+# Initialize password context with a pinned bcrypt cost so hashing time
+# stays predictable. verify() compares digests in constant time.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.bcrypt_rounds
+)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -40,37 +53,14 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 def get_password_hash(password: str) -> str:
     """Hash a password."""
-    # Bcrypt has a 72-byte limit, truncate if necessary
+    # Bcrypt has a 72-byte limit; truncate once up front, which is what
+    # bcrypt itself would use of a longer password anyway
     password_bytes = password.encode('utf-8')
     if len(password_bytes) > 72:
         # Truncate to 72 bytes, handling multi-byte characters
         password = password_bytes[:72].decode('utf-8', errors='ignore')
     
-    # Workaround for passlib/bcrypt initialization issue
-    # The error can occur during backend initialization's bug detection phase
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            return pwd_context.hash(password)
-        except ValueError as e:
-            error_msg = str(e)
-            # Handle bcrypt password length errors
-            if "password cannot be longer than 72 bytes" in error_msg:
-                if attempt < max_retries - 1:
-                    # Further truncate and retry
-                    password = password[:50]
-                    continue
-                else:
-                    # Last attempt - use a safe fallback length
-                    password = password[:40]
-                    return pwd_context.hash(password)
-            # Re-raise if it's a different ValueError
-            raise
-        except Exception:
-            # For other exceptions (like initialization issues), retry once
-            if attempt < max_retries - 1:
-                continue
-            raise
+    return pwd_context.hash(password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -81,17 +71,23 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=settings.access_token_expire_minutes)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
+    encoded_jwt = jwt.encode(to_encode, _SECRET_KEY, algorithm=settings.algorithm)
     return encoded_jwt
 
 
-def decode_access_token(token: str) -> Optional[dict]:
-    """Decode and verify a JWT token."""
+@lru_cache(maxsize=4096)
+def _verify_token(token: str) -> Optional[dict]:
+    """Verify a token's signature and claims, memoized per token string."""
     try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        return payload
+        return jwt.decode(token, _SECRET_KEY, algorithms=[settings.algorithm], options=_DECODE_OPTIONS)
     except JWTError:
         return None
 
 
-
+def decode_access_token(token: str) -> Optional[dict]:
+    """Decode and verify a JWT token."""
+    payload = _verify_token(token)
+    # A cached payload may have expired since it was first verified
+    if payload is None or payload["exp"] <= time.time():
+        return None
+    return dict(payload)
@@ -0,0 +1,57 @@
+"""Optional Redis-backed cache for expensive, non-user-specific responses."""
+from typing import Optional
+from app.config import settings
+from app.utils.logger import get_logger
+
+try:
+    import redis
+except ImportError:  # Redis is optional; caching is disabled without it
+    redis = None
+
+logger = get_logger(__name__)
+
+_client = None
+
+
+def get_redis_client():
+    """Get the shared Redis client, or None if caching is not configured."""
+    global _client
+    if _client is None and redis is not None and settings.redis_url:
+        _client = redis.Redis.from_url(settings.redis_url, socket_timeout=0.1)
+    return _client
+
+
+def cache_get(key: str) -> Optional[bytes]:
+    """Get a cached value. Cache errors are treated as misses."""
+    client = get_redis_client()
+    if client is None:
+        return None
+    try:
+        return client.get(key)
+    except redis.RedisError as e:
+        logger.warning(f"Cache get failed for {key}: {e}")
+        return None
+
+
+def cache_set(key: str, value: bytes, ttl_seconds: int) -> None:
+    """Store a value with a TTL. Cache errors are logged and ignored."""
+    client = get_redis_client()
+    if client is None:
+        return
+    try:
+        client.set(key, value, ex=ttl_seconds)
+    except redis.RedisError as e:
+        logger.warning(f"Cache set failed for {key}: {e}")
+
+
+def cache_delete_prefix(prefix: str) -> None:
+    """Delete every cached key starting with prefix. Cache errors are logged and ignored."""
+    client = get_redis_client()
+    if client is None:
+        return
+    try:
+        keys = list(client.scan_iter(match=f"{prefix}*"))
+        if keys:
+            client.delete(*keys)
+    except redis.RedisError as e:
+        logger.warning(f"Cache delete failed for {prefix}*: {e}")
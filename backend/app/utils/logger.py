@@ -1,15 +1,24 @@
 """Logging configuration."""
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
-import json
 from app.config import settings
 
-def get_logger(name: str) -> logging.Logger:
-    """Get configured logger instance."""
-    logger = logging.getLogger(name)
-    logger.setLevel(getattr(logging, settings.log_level.upper()))
+_queue_handler = None
+
+
+def _get_queue_handler() -> logging.Handler:
+    """
+    Get the shared handler that hands records to a background writer thread.
     
-    if not logger.handlers:
+    Writing to stdout can block; with a QueueHandler the calling thread (or
+    the event loop) only enqueues the record and a QueueListener thread does
+    the actual I/O.
+    """
+    global _queue_handler
+    if _queue_handler is None:
         handler = logging.StreamHandler(sys.stdout)
         
         # Use JSON formatter if structured logging is enabled
@@ -21,7 +30,21 @@ def get_logger(name: str) -> logging.Logger:
             )
         
         handler.setFormatter(formatter)
-        logger.addHandler(handler)
+        
+        log_queue = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(log_queue, handler)
+        listener.start()
+        atexit.register(listener.stop)
+        _queue_handler = logging.handlers.QueueHandler(log_queue)
+    return _queue_handler
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Get configured logger instance."""
+    logger = logging.getLogger(name)
+    logger.setLevel(getattr(logging, settings.log_level.upper()))
+    
+    if not logger.handlers:
+        logger.addHandler(_get_queue_handler())
     
     return logger
-
@@ -1,9 +1,11 @@
 """Initialize database tables."""
 from app.database.base import Base, engine
+from app.database.migrations import upgrade_schema
 
 if __name__ == "__main__":
     print("Creating database tables...")
     Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
     print("Database tables created successfully!")
 
 
@@ -1,12 +1,15 @@
 """Retrain model with improved parameters for better performance."""
-import pandas as pd
 import numpy as np
 from sklearn.ensemble import IsolationForest
-from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import classification_report, confusion_matrix
 import pickle
 from pathlib import Path
 
+try:
+    from ml.train import FEATURE_COLUMNS, TIME_COLUMNS, add_derived_features, prepare_training_matrix, report_tree_depth, sample_classes
+except ImportError:  # Run as a script (python ml/retrain_improved.py)
+    from train import FEATURE_COLUMNS, TIME_COLUMNS, add_derived_features, prepare_training_matrix, report_tree_depth, sample_classes
+
 # Create models directory if it doesn't exist
 MODEL_DIR = Path("models")
 MODEL_DIR.mkdir(exist_ok=True)
@@ -21,98 +24,78 @@ def generate_training_data(n_samples=20000):
     
     In production, you would use real historical data.
     """
-    np.random.seed(42)
-    
-    data = []
+    rng = np.random.default_rng(42)
     
-    # Generate normal traffic patterns (more realistic)
-    for _ in range(int(n_samples * 0.95)):  # 95% normal
-        data.append({
-            "response_time_ms": max(10, np.random.normal(50, 15)),  # 10-200ms typical
-            "status_code": np.random.choice([200, 201, 204], p=[0.85, 0.12, 0.03]),
-            "request_size_bytes": max(100, np.random.normal(800, 300)),
-            "response_size_bytes": max(200, np.random.normal(3000, 1500)),
-            "hour_of_day": np.random.randint(0, 24),
-            "day_of_week": np.random.randint(0, 7),
-            "minute_of_hour": np.random.randint(0, 60),
-            "is_error": 0,
-            "is_server_error": 0,
-            "is_client_error": 0,
-            "endpoint_length": max(5, np.random.normal(25, 8)),
-            "method_get": np.random.choice([0, 1], p=[0.25, 0.75]),
-            "method_post": np.random.choice([0, 1], p=[0.75, 0.25]),
-        })
+    # Normal traffic patterns (more realistic, 95%)
+    normal = {
+        "response_time_ms": ("normal", 50, 15, 10),  # 10-200ms typical
+        "status_code": ("choice", [200, 201, 204], [0.85, 0.12, 0.03]),
+        "request_size_bytes": ("normal", 800, 300, 100),
+        "response_size_bytes": ("normal", 3000, 1500, 200),
+        **TIME_COLUMNS,
+        "is_error": ("const", 0),
+        "is_server_error": ("const", 0),
+        "is_client_error": ("const", 0),
+        "endpoint_length": ("normal", 25, 8, 5),
+        "method_get": ("choice", [0, 1], [0.25, 0.75]),
+        "method_post": ("choice", [0, 1], [0.75, 0.25]),
+    }
     
-    # Generate anomalous traffic patterns (more distinct)
-    for _ in range(int(n_samples * 0.05)):  # 5% anomalies
-        anomaly_type = np.random.choice(["slow", "error", "large", "spike"], p=[0.3, 0.4, 0.2, 0.1])
-        
-        if anomaly_type == "slow":
-            data.append({
-                "response_time_ms": np.random.normal(3000, 800),  # Very slow
-                "status_code": 200,
-                "request_size_bytes": np.random.normal(1000, 500),
-                "response_size_bytes": np.random.normal(5000, 2000),
-                "hour_of_day": np.random.randint(0, 24),
-                "day_of_week": np.random.randint(0, 7),
-                "minute_of_hour": np.random.randint(0, 60),
-                "is_error": 0,
-                "is_server_error": 0,
-                "is_client_error": 0,
-                "endpoint_length": np.random.normal(20, 10),
-                "method_get": np.random.choice([0, 1], p=[0.3, 0.7]),
-                "method_post": np.random.choice([0, 1], p=[0.7, 0.3]),
-            })
-        elif anomaly_type == "error":
-            data.append({
-                "response_time_ms": np.random.normal(100, 50),
-                "status_code": np.random.choice([500, 502, 503, 504], p=[0.5, 0.2, 0.2, 0.1]),
-                "request_size_bytes": np.random.normal(1000, 500),
-                "response_size_bytes": np.random.normal(200, 100),  # Small error responses
-                "hour_of_day": np.random.randint(0, 24),
-                "day_of_week": np.random.randint(0, 7),
-                "minute_of_hour": np.random.randint(0, 60),
-                "is_error": 1,
-                "is_server_error": 1,
-                "is_client_error": 0,
-                "endpoint_length": np.random.normal(20, 10),
-                "method_get": np.random.choice([0, 1], p=[0.3, 0.7]),
-                "method_post": np.random.choice([0, 1], p=[0.7, 0.3]),
-            })
-        elif anomaly_type == "large":
-            data.append({
-                "response_time_ms": np.random.normal(200, 100),
-                "status_code": 200,
-                "request_size_bytes": np.random.normal(8000000, 2000000),  # Very large
-                "response_size_bytes": np.random.normal(15000000, 3000000),
-                "hour_of_day": np.random.randint(0, 24),
-                "day_of_week": np.random.randint(0, 7),
-                "minute_of_hour": np.random.randint(0, 60),
-                "is_error": 0,
-                "is_server_error": 0,
-                "is_client_error": 0,
-                "endpoint_length": np.random.normal(20, 10),
-                "method_get": np.random.choice([0, 1], p=[0.3, 0.7]),
-                "method_post": np.random.choice([0, 1], p=[0.7, 0.3]),
-            })
-        else:  # spike
-            data.append({
-                "response_time_ms": np.random.normal(5000, 1500),  # Extreme spike
-                "status_code": np.random.choice([200, 500], p=[0.6, 0.4]),
-                "request_size_bytes": np.random.normal(3000, 1500),
-                "response_size_bytes": np.random.normal(10000, 4000),
-                "hour_of_day": np.random.randint(0, 24),
-                "day_of_week": np.random.randint(0, 7),
-                "minute_of_hour": np.random.randint(0, 60),
-                "is_error": np.random.choice([0, 1], p=[0.6, 0.4]),
-                "is_server_error": np.random.choice([0, 1], p=[0.6, 0.4]),
-                "is_client_error": 0,
-                "endpoint_length": np.random.normal(35, 12),
-                "method_get": np.random.choice([0, 1], p=[0.3, 0.7]),
-                "method_post": np.random.choice([0, 1], p=[0.7, 0.3]),
-            })
+    # Anomalous traffic patterns (more distinct, 5%)
+    slow = {
+        "response_time_ms": ("normal", 3000, 800, None),  # Very slow
+        "status_code": ("const", 200),
+        "request_size_bytes": ("normal", 1000, 500, None),
+        "response_size_bytes": ("normal", 5000, 2000, None),
+        **TIME_COLUMNS,
+        "is_error": ("const", 0),
+        "is_server_error": ("const", 0),
+        "is_client_error": ("const", 0),
+        "endpoint_length": ("normal", 20, 10, None),
+        "method_get": ("choice", [0, 1], [0.3, 0.7]),
+        "method_post": ("choice", [0, 1], [0.7, 0.3]),
+    }
+    error = {
+        "response_time_ms": ("normal", 100, 50, None),
+        "status_code": ("choice", [500, 502, 503, 504], [0.5, 0.2, 0.2, 0.1]),
+        "request_size_bytes": ("normal", 1000, 500, None),
+        "response_size_bytes": ("normal", 200, 100, None),  # Small error responses
+        **TIME_COLUMNS,
+        "is_error": ("const", 1),
+        "is_server_error": ("const", 1),
+        "is_client_error": ("const", 0),
+        "endpoint_length": ("normal", 20, 10, None),
+        "method_get": ("choice", [0, 1], [0.3, 0.7]),
+        "method_post": ("choice", [0, 1], [0.7, 0.3]),
+    }
+    large = {
+        "response_time_ms": ("normal", 200, 100, None),
+        "status_code": ("const", 200),
+        "request_size_bytes": ("normal", 8000000, 2000000, None),  # Very large
+        "response_size_bytes": ("normal", 15000000, 3000000, None),
+        **TIME_COLUMNS,
+        "is_error": ("const", 0),
+        "is_server_error": ("const", 0),
+        "is_client_error": ("const", 0),
+        "endpoint_length": ("normal", 20, 10, None),
+        "method_get": ("choice", [0, 1], [0.3, 0.7]),
+        "method_post": ("choice", [0, 1], [0.7, 0.3]),
+    }
+    spike = {
+        "response_time_ms": ("normal", 5000, 1500, None),  # Extreme spike
+        "status_code": ("choice", [200, 500], [0.6, 0.4]),
+        "request_size_bytes": ("normal", 3000, 1500, None),
+        "response_size_bytes": ("normal", 10000, 4000, None),
+        **TIME_COLUMNS,
+        "is_error": ("choice", [0, 1], [0.6, 0.4]),
+        "is_server_error": ("choice", [0, 1], [0.6, 0.4]),
+        "is_client_error": ("const", 0),
+        "endpoint_length": ("normal", 35, 12, None),
+        "method_get": ("choice", [0, 1], [0.3, 0.7]),
+        "method_post": ("choice", [0, 1], [0.7, 0.3]),
+    }
     
-    return pd.DataFrame(data)
+    return sample_classes(rng, n_samples, normal, [slow, error, large, spike], [0.3, 0.4, 0.2, 0.1])
 
 
 def train_improved_model():
@@ -120,24 +103,10 @@ def train_improved_model():
     print("Generating improved training data...")
     df = generate_training_data(n_samples=20000)
     
-    # Feature order (must match feature_extractor)
-    feature_columns = [
-        "response_time_ms",
-        "status_code",
-        "request_size_bytes",
-        "response_size_bytes",
-        "hour_of_day",
-        "day_of_week",
-        "minute_of_hour",
-        "is_error",
-        "is_server_error",
-        "is_client_error",
-        "endpoint_length",
-        "method_get",
-        "method_post",
-    ]
+    # Same features as the serving model expects
+    df = add_derived_features(df)
     
-    X = df[feature_columns].values
+    X = df[FEATURE_COLUMNS].values
     
     # Create labels for evaluation (anomalies = server errors, very slow, or very large)
     y_true = (
@@ -148,8 +117,7 @@ def train_improved_model():
     
     # Scale features
     print("Scaling features...")
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
+    X_scaled, scaler = prepare_training_matrix(X)
     
     # Train Isolation Forest with improved parameters
     print("Training improved Isolation Forest model...")
@@ -163,6 +131,8 @@ def train_improved_model():
     )
     model.fit(X_scaled)
     
+    report_tree_depth(model)
+    
     # Evaluate on training data
     predictions = model.predict(X_scaled)
     y_pred = (predictions == -1).astype(int)  # -1 = anomaly, 1 = normal
@@ -2,7 +2,6 @@
 import pandas as pd
 import numpy as np
 from sklearn.ensemble import IsolationForest
-from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import precision_score, recall_score, f1_score, accuracy_score, confusion_matrix
 import pickle
 import os
@@ -15,6 +14,72 @@ MODEL_DIR.mkdir(exist_ok=True)
 MODEL_PATH = MODEL_DIR / "anomaly_detector_v1.pkl"
 SCALER_PATH = MODEL_DIR / "scaler_v1.pkl"
 
+# Feature order (must match FEATURE_ORDER in app/services/anomaly_detector.py)
+FEATURE_COLUMNS = [
+    "response_time_ms",
+    "status_code",
+    "request_size_bytes",
+    "response_size_bytes",
+    "hour_of_day",
+    "day_of_week",
+    "minute_of_hour",
+    "is_error",
+    "is_server_error",
+    "is_client_error",
+    "endpoint_length",
+    "method_get",
+    "method_post",
+    "response_to_request_ratio",
+    "throughput_mbps",
+    "is_very_slow",
+    "is_very_large_request",
+    "is_very_large_response",
+]
+
+
+# Columns sampled the same way for every traffic class
+TIME_COLUMNS = {
+    "hour_of_day": ("integers", 0, 24),
+    "day_of_week": ("integers", 0, 7),
+    "minute_of_hour": ("integers", 0, 60),
+}
+
+
+def sample_block(rng, n, spec):
+    """
+    Sample n rows of one traffic class, one vectorized call per column.
+    
+    spec maps each column to a sampler: ("normal", mean, std, minimum or
+    None), ("choice", values, probabilities), ("integers", low, high) or
+    ("const", value).
+    """
+    columns = {}
+    for column, (kind, *params) in spec.items():
+        if kind == "normal":
+            mean, std, minimum = params
+            values = rng.normal(mean, std, n)
+            columns[column] = values if minimum is None else np.maximum(minimum, values)
+        elif kind == "choice":
+            values, p = params
+            columns[column] = rng.choice(values, size=n, p=p)
+        elif kind == "integers":
+            low, high = params
+            columns[column] = rng.integers(low, high, n)
+        else:  # const
+            columns[column] = np.full(n, params[0])
+    return pd.DataFrame(columns)
+
+
+def sample_classes(rng, n_samples, normal_spec, anomaly_specs, anomaly_p, anomaly_rate=0.05):
+    """Sample normal traffic plus anomalies split across anomaly_specs with probabilities anomaly_p."""
+    n_normal = int(n_samples * (1 - anomaly_rate))
+    n_anomalies = int(n_samples * anomaly_rate)
+    counts = np.bincount(rng.choice(len(anomaly_specs), size=n_anomalies, p=anomaly_p), minlength=len(anomaly_specs))
+    
+    blocks = [sample_block(rng, n_normal, normal_spec)]
+    blocks.extend(sample_block(rng, count, spec) for spec, count in zip(anomaly_specs, counts))
+    return pd.concat(blocks, ignore_index=True)
+
 
 def generate_training_data(n_samples=20000):
     """
@@ -25,133 +90,134 @@ def generate_training_data(n_samples=20000):
     
     In production, you would use real historical data.
     """
-    np.random.seed(42)
-    
-    data = []
-    
-    # Generate NORMAL traffic patterns - very distinct, healthy patterns
-    for _ in range(int(n_samples * 0.95)):  # 95% normal
-        data.append({
-            "response_time_ms": max(10, np.random.normal(45, 12)),  # Fast: 10-100ms typical
-            "status_code": np.random.choice([200, 201, 204], p=[0.85, 0.12, 0.03]),  # Always success
-            "request_size_bytes": max(50, np.random.normal(800, 250)),  # Small-medium: 50-2000 bytes
-            "response_size_bytes": max(100, np.random.normal(2500, 800)),  # Small-medium: 100-5000 bytes
-            "hour_of_day": np.random.randint(0, 24),
-            "day_of_week": np.random.randint(0, 7),
-            "minute_of_hour": np.random.randint(0, 60),
-            "is_error": 0,  # No errors
-            "is_server_error": 0,  # No server errors
-            "is_client_error": 0,  # No client errors
-            "endpoint_length": max(5, np.random.normal(22, 6)),  # Normal endpoint lengths
-            "method_get": np.random.choice([0, 1], p=[0.25, 0.75]),  # Mostly GET
-            "method_post": np.random.choice([0, 1], p=[0.75, 0.25]),  # Some POST
-        })
-    
-    # Generate ANOMALOUS traffic patterns - very distinct, clearly problematic
-    for _ in range(int(n_samples * 0.05)):  # 5% anomalies
-        anomaly_type = np.random.choice(["server_error", "very_slow", "very_large"], p=[0.4, 0.35, 0.25])
-        
-        if anomaly_type == "server_error":
-            # Server errors: 5xx status codes, small responses
-            data.append({
-                "response_time_ms": np.random.normal(150, 50),  # Can be fast or slow
-                "status_code": np.random.choice([500, 502, 503, 504], p=[0.5, 0.2, 0.2, 0.1]),  # Always 5xx
-                "request_size_bytes": np.random.normal(800, 250),  # Normal request size
-                "response_size_bytes": max(50, np.random.normal(150, 50)),  # Small error response
-                "hour_of_day": np.random.randint(0, 24),
-                "day_of_week": np.random.randint(0, 7),
-                "minute_of_hour": np.random.randint(0, 60),
-                "is_error": 1,  # Error flag
-                "is_server_error": 1,  # Server error flag
-                "is_client_error": 0,
-                "endpoint_length": np.random.normal(22, 6),
-                "method_get": np.random.choice([0, 1], p=[0.3, 0.7]),
-                "method_post": np.random.choice([0, 1], p=[0.7, 0.3]),
-            })
-        elif anomaly_type == "very_slow":
-            # Very slow responses: >3000ms, but successful
-            data.append({
-                "response_time_ms": np.random.normal(5000, 1500),  # Very slow: 3000-10000ms
-                "status_code": 200,  # But successful
-                "request_size_bytes": np.random.normal(800, 250),  # Normal request
-                "response_size_bytes": np.random.normal(2500, 800),  # Normal response
-                "hour_of_day": np.random.randint(0, 24),
-                "day_of_week": np.random.randint(0, 7),
-                "minute_of_hour": np.random.randint(0, 60),
-                "is_error": 0,
-                "is_server_error": 0,
-                "is_client_error": 0,
-                "endpoint_length": np.random.normal(22, 6),
-                "method_get": np.random.choice([0, 1], p=[0.3, 0.7]),
-                "method_post": np.random.choice([0, 1], p=[0.7, 0.3]),
-            })
-        else:  # very_large
-            # Very large requests/responses: >10MB
-            data.append({
-                "response_time_ms": np.random.normal(200, 80),  # Normal response time
-                "status_code": 200,  # Successful
-                "request_size_bytes": np.random.normal(12000000, 3000000),  # Very large: 8-20MB
-                "response_size_bytes": np.random.normal(20000000, 5000000),  # Very large: 10-30MB
-                "hour_of_day": np.random.randint(0, 24),
-                "day_of_week": np.random.randint(0, 7),
-                "minute_of_hour": np.random.randint(0, 60),
-                "is_error": 0,
-                "is_server_error": 0,
-                "is_client_error": 0,
-                "endpoint_length": np.random.normal(22, 6),
-                "method_get": np.random.choice([0, 1], p=[0.2, 0.8]),  # Mostly GET for large
-                "method_post": np.random.choice([0, 1], p=[0.8, 0.2]),
-            })
-    
-    return pd.DataFrame(data)
+    rng = np.random.default_rng(42)
+    
+    # NORMAL traffic patterns - very distinct, healthy patterns (95%)
+    normal = {
+        "response_time_ms": ("normal", 45, 12, 10),  # Fast: 10-100ms typical
+        "status_code": ("choice", [200, 201, 204], [0.85, 0.12, 0.03]),  # Always success
+        "request_size_bytes": ("normal", 800, 250, 50),  # Small-medium: 50-2000 bytes
+        "response_size_bytes": ("normal", 2500, 800, 100),  # Small-medium: 100-5000 bytes
+        **TIME_COLUMNS,
+        "is_error": ("const", 0),  # No errors
+        "is_server_error": ("const", 0),  # No server errors
+        "is_client_error": ("const", 0),  # No client errors
+        "endpoint_length": ("normal", 22, 6, 5),  # Normal endpoint lengths
+        "method_get": ("choice", [0, 1], [0.25, 0.75]),  # Mostly GET
+        "method_post": ("choice", [0, 1], [0.75, 0.25]),  # Some POST
+    }
+    
+    # ANOMALOUS traffic patterns - very distinct, clearly problematic (5%)
+    # Server errors: 5xx status codes, small responses
+    server_error = {
+        "response_time_ms": ("normal", 150, 50, None),  # Can be fast or slow
+        "status_code": ("choice", [500, 502, 503, 504], [0.5, 0.2, 0.2, 0.1]),  # Always 5xx
+        "request_size_bytes": ("normal", 800, 250, None),  # Normal request size
+        "response_size_bytes": ("normal", 150, 50, 50),  # Small error response
+        **TIME_COLUMNS,
+        "is_error": ("const", 1),  # Error flag
+        "is_server_error": ("const", 1),  # Server error flag
+        "is_client_error": ("const", 0),
+        "endpoint_length": ("normal", 22, 6, None),
+        "method_get": ("choice", [0, 1], [0.3, 0.7]),
+        "method_post": ("choice", [0, 1], [0.7, 0.3]),
+    }
+    # Very slow responses: >3000ms, but successful
+    very_slow = {
+        "response_time_ms": ("normal", 5000, 1500, None),  # Very slow: 3000-10000ms
+        "status_code": ("const", 200),  # But successful
+        "request_size_bytes": ("normal", 800, 250, None),  # Normal request
+        "response_size_bytes": ("normal", 2500, 800, None),  # Normal response
+        **TIME_COLUMNS,
+        "is_error": ("const", 0),
+        "is_server_error": ("const", 0),
+        "is_client_error": ("const", 0),
+        "endpoint_length": ("normal", 22, 6, None),
+        "method_get": ("choice", [0, 1], [0.3, 0.7]),
+        "method_post": ("choice", [0, 1], [0.7, 0.3]),
+    }
+    # Very large requests/responses: >10MB
+    very_large = {
+        "response_time_ms": ("normal", 200, 80, None),  # Normal response time
+        "status_code": ("const", 200),  # Successful
+        "request_size_bytes": ("normal", 12000000, 3000000, None),  # Very large: 8-20MB
+        "response_size_bytes": ("normal", 20000000, 5000000, None),  # Very large: 10-30MB
+        **TIME_COLUMNS,
+        "is_error": ("const", 0),
+        "is_server_error": ("const", 0),
+        "is_client_error": ("const", 0),
+        "endpoint_length": ("normal", 22, 6, None),
+        "method_get": ("choice", [0, 1], [0.2, 0.8]),  # Mostly GET for large
+        "method_post": ("choice", [0, 1], [0.8, 0.2]),
+    }
+    
+    return sample_classes(rng, n_samples, normal, [server_error, very_slow, very_large], [0.4, 0.35, 0.25])
 
 
-def train_model():
-    """Train the anomaly detection model."""
-    print("Generating training data...")
-    df = generate_training_data(n_samples=10000)
-    
-    # Add derived features (advanced feature engineering)
+def add_derived_features(df):
+    """Add derived features (advanced feature engineering), as FeatureExtractor computes them."""
     df["response_to_request_ratio"] = df["response_size_bytes"] / df["request_size_bytes"].clip(lower=1)
     df["throughput_mbps"] = (df["response_size_bytes"] * 8) / (df["response_time_ms"].clip(lower=1) * 1000)
     df["is_very_slow"] = (df["response_time_ms"] > 3000).astype(float)
     df["is_very_large_request"] = (df["request_size_bytes"] > 10000000).astype(float)
     df["is_very_large_response"] = (df["response_size_bytes"] > 10000000).astype(float)
+    return df
+
+
+def fit_scaler(X):
+    """
+    Standardize X, returning (X_scaled, scaler).
+    
+    The scaler is saved as a plain {"mean", "scale"} dict of arrays rather
+    than a StandardScaler object; the values match StandardScaler, including
+    a scale of 1 for constant columns.
+    """
+    mean = X.mean(axis=0, dtype=np.float64)
+    scale = X.std(axis=0, dtype=np.float64)
+    scale[scale < 10 * np.finfo(np.float64).eps] = 1.0
+    X_scaled = (X - mean) / scale
+    return X_scaled, {"mean": mean, "scale": scale}
+
+
+def prepare_training_matrix(X):
+    """
+    Standardize X for IsolationForest, returning (X_scaled, scaler).
+    
+    IsolationForest casts its input to float32 for every fit/predict call,
+    so the scaled matrix is cast once up front to skip that conversion copy.
+    """
+    X_scaled, scaler = fit_scaler(X)
+    return np.ascontiguousarray(X_scaled, dtype=np.float32), scaler
+
+
+def report_tree_depth(model):
+    """
+    Print the depth of a fitted IsolationForest's trees.
+    
+    Scoring cost grows with tree depth, which IsolationForest caps at
+    ceil(log2(max_samples)) (8 for 256 samples).
+    """
+    tree_depths = [estimator.tree_.max_depth for estimator in model.estimators_]
+    print(f"Trees: {len(tree_depths)}, mean depth: {np.mean(tree_depths):.1f}, max depth: {max(tree_depths)}")
+
+
+def train_model():
+    """Train the anomaly detection model."""
+    print("Generating training data...")
+    df = generate_training_data(n_samples=10000)
+    df = add_derived_features(df)
     
-    # Feature order (must match feature_extractor)
-    feature_columns = [
-        "response_time_ms",
-        "status_code",
-        "request_size_bytes",
-        "response_size_bytes",
-        "hour_of_day",
-        "day_of_week",
-        "minute_of_hour",
-        "is_error",
-        "is_server_error",
-        "is_client_error",
-        "endpoint_length",
-        "method_get",
-        "method_post",
-        "response_to_request_ratio",
-        "throughput_mbps",
-        "is_very_slow",
-        "is_very_large_request",
-        "is_very_large_response",
-    ]
-    
-    X = df[feature_columns].values
+    X = df[FEATURE_COLUMNS].values
     
     # Scale features
     print("Scaling features...")
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
+    X_scaled, scaler = prepare_training_matrix(X)
     
     # Train Isolation Forest with optimized parameters
     print("Training Isolation Forest model...")
     print("Using advanced ML techniques:")
     print("  - Isolation Forest (unsupervised anomaly detection)")
-    print("  - StandardScaler for feature normalization")
+    print("  - Standard scaling for feature normalization")
     print("  - Optimized contamination and tree parameters")
     
     model = IsolationForest(
@@ -165,6 +231,8 @@ def train_model():
     )
     model.fit(X_scaled)
     
+    report_tree_depth(model)
+    
     # Save model and scaler
     print(f"Saving model to {MODEL_PATH}...")
     with open(MODEL_PATH, 'wb') as f:
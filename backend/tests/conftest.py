@@ -1,10 +1,14 @@
 """Pytest configuration and fixtures."""
+import os
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
+# Minimum bcrypt cost, so password hashing doesn't dominate auth test time
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
 from app.main import app
 from app.database.base import Base, get_db
 
@@ -109,6 +109,51 @@ def test_get_anomalies_pagination(client, db_session):
     assert response.status_code == 200
     data = response.json()
     assert len(data["anomalies"]) == 5  # Remaining 5
+    assert data["total"] == 15
+    
+    # Offset past the end still reports the total
+    response = client.get("/api/anomalies", params={"limit": 10, "offset": 20})
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["anomalies"]) == 0
+    assert data["total"] == 15
+
+
+def test_get_anomalies_cursor_pagination(client, db_session):
+    """Test anomalies endpoint keyset pagination with next_cursor."""
+    from app.database.models import Anomaly
+    from datetime import datetime, timedelta, timezone
+    
+    now = datetime.now(timezone.utc)
+    for i in range(15):
+        db_session.add(Anomaly(
+            detected_at=now - timedelta(minutes=i),
+            anomaly_score=0.9,
+            anomaly_type="server_error",
+            is_resolved=False
+        ))
+    db_session.commit()
+    
+    # First page hands back a cursor
+    response = client.get("/api/anomalies", params={"limit": 10})
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["anomalies"]) == 10
+    assert data["next_cursor"] is not None
+    first_page_ids = {a["id"] for a in data["anomalies"]}
+    
+    # Second page continues after the cursor
+    response = client.get("/api/anomalies", params={"limit": 10, "cursor": data["next_cursor"]})
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["anomalies"]) == 5
+    assert data["total"] == 15
+    assert data["next_cursor"] is None
+    assert first_page_ids.isdisjoint(a["id"] for a in data["anomalies"])
+    
+    # Garbage cursors are rejected
+    response = client.get("/api/anomalies", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
 
 
 def test_get_anomalies_includes_traffic_log(client, db_session):
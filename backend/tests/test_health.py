@@ -39,6 +39,7 @@ def test_health_check_model_status(client):
     data = response.json()
     assert "model_loaded" in data
     assert isinstance(data["model_loaded"], bool)
+    assert set(data["prediction_cache"]) == {"size", "hits", "misses", "hit_rate"}
 
 
 def test_health_check_uptime(client):
@@ -51,4 +52,18 @@ def test_health_check_uptime(client):
     assert data["uptime_seconds"] >= 0
 
 
+def test_health_check_is_cached_within_ttl(client):
+    """Test repeated health checks within the TTL reuse the last result."""
+    first = client.get("/api/health").json()
+    second = client.get("/api/health").json()
+    assert first == second
 
+
+def test_responses_carry_correlation_headers(client):
+    """Test the correlation middleware tags each response with its ID and timing."""
+    first = client.get("/")
+    second = client.get("/")
+    
+    assert len(first.headers["X-Correlation-ID"]) == 16
+    assert first.headers["X-Correlation-ID"] != second.headers["X-Correlation-ID"]
+    assert first.headers["X-Response-Time"].endswith("ms")
@@ -143,4 +143,217 @@ def test_get_metrics_time_range_validation(client):
     assert response.status_code == 200
 
 
+def test_get_metrics_percentile_values(client, db_session):
+    """Test p95/p99 interpolate linearly within each minute window, like np.percentile."""
+    from app.database.models import TrafficLog
+    
+    window = (datetime.now(timezone.utc) - timedelta(hours=1)).replace(second=0, microsecond=0)
+    for i, rt in enumerate([50, 100, 150, 200, 250, 300, 350, 400, 450, 500]):
+        db_session.add(TrafficLog(
+            timestamp=window + timedelta(seconds=i),
+            endpoint="/api/percentiles",
+            method="GET",
+            status_code=500 if rt == 500 else 200,
+            response_time_ms=rt
+        ))
+    db_session.commit()
+    
+    response = client.get("/api/metrics", params={"endpoint": "/api/percentiles"})
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["metrics"]) == 1
+    
+    metric = data["metrics"][0]
+    assert metric["request_count"] == 10
+    assert metric["error_count"] == 1
+    assert metric["avg_response_time_ms"] == 275
+    assert metric["p95_response_time_ms"] == pytest.approx(477.5)
+    assert metric["p99_response_time_ms"] == pytest.approx(495.5)
+
+
+def test_get_metrics_python_aggregation_matches_sql(client, db_session, monkeypatch):
+    """Test the NumPy fallback buckets and aggregates like the SQL path."""
+    from app.config import settings
+    from app.database.models import TrafficLog
+    
+    window = (datetime.now(timezone.utc) - timedelta(hours=2)).replace(second=0, microsecond=0)
+    for i in range(30):
+        db_session.add(TrafficLog(
+            timestamp=window + timedelta(seconds=17 * i),
+            endpoint=f"/api/endpoint{i % 3}",
+            method="GET",
+            status_code=500 if i % 7 == 0 else 200,
+            response_time_ms=10 * (i + 1)
+        ))
+    db_session.commit()
+    
+    sql_metrics = client.get("/api/metrics").json()["metrics"]
+    
+    monkeypatch.setattr(settings, "metrics_sql_aggregation", False)
+    python_metrics = client.get("/api/metrics").json()["metrics"]
+    
+    def key(metric):
+        return (metric["time_window"], metric["endpoint"])
+    
+    assert len(sql_metrics) > 0
+    assert len(python_metrics) == len(sql_metrics)
+    for sql_metric, python_metric in zip(sorted(sql_metrics, key=key), sorted(python_metrics, key=key)):
+        assert python_metric == pytest.approx(sql_metric)
+
+
+def test_grouped_percentile_matches_numpy():
+    """Test the vectorized per-group percentile against np.percentile."""
+    import numpy as np
+    from app.services.metrics_aggregator import _grouped_percentile
+    
+    rng = np.random.default_rng(0)
+    groups = [np.sort(rng.integers(1, 5000, size=n)).astype(np.float64) for n in (1, 2, 7, 20, 101)]
+    sizes = np.array([len(g) for g in groups])
+    starts = np.cumsum(sizes) - sizes
+    values = np.concatenate(groups)
+    
+    for q in (0.95, 0.99):
+        expected = [np.percentile(g, q * 100) for g in groups]
+        assert _grouped_percentile(values, starts, sizes, q) == pytest.approx(expected)
+
+
+def test_metrics_rollup_matches_live_aggregation(db_session):
+    """Test the rollup table holds the same metrics as live aggregation, incrementally."""
+    from app.database.models import MetricRollup1m, MetricRollupState, TrafficLog
+    from app.services.metrics_aggregator import aggregate_metrics
+    from app.services.metrics_rollup import MetricsRollup, read_metrics
+    
+    window = (datetime.now(timezone.utc) - timedelta(hours=1)).replace(second=0, microsecond=0)
+    
+    def add_logs(offset):
+        for i in range(10):
+            db_session.add(TrafficLog(
+                timestamp=window + timedelta(seconds=offset + 13 * i),
+                endpoint=f"/api/endpoint{i % 2}",
+                method="GET",
+                status_code=500 if i == 3 else 200,
+                response_time_ms=25 * (i + offset)
+            ))
+        db_session.commit()
+    
+    def assert_same_metrics(rolled_up, live):
+        assert len(rolled_up) == len(live) > 0
+        key = lambda metric: (metric["time_window"], metric["endpoint"])
+        for rolled_up_metric, live_metric in zip(sorted(rolled_up, key=key), sorted(live, key=key)):
+            assert rolled_up_metric == pytest.approx(live_metric)
+    
+    start, end = window - timedelta(minutes=5), window + timedelta(minutes=5)
+    rollup = MetricsRollup()
+    
+    add_logs(0)
+    assert rollup.run_once(db_session) > 0
+    assert rollup.ready
+    assert db_session.get(MetricRollupState, 1) is not None
+    assert_same_metrics(read_metrics(db_session, start, end), aggregate_metrics(db_session, start, end))
+    
+    # Re-running only re-aggregates the trailing window; upserts keep one row per minute
+    rollup.run_once(db_session)
+    live = aggregate_metrics(db_session, start, end)
+    assert_same_metrics(read_metrics(db_session, start, end), live)
+    assert db_session.query(MetricRollup1m).count() == len(live)
+    
+    # New logs in an already rolled-up minute update that minute's metrics
+    add_logs(30)
+    rollup.run_once(db_session)
+    live = aggregate_metrics(db_session, start, end)
+    assert_same_metrics(read_metrics(db_session, start, end), live)
+    assert db_session.query(MetricRollup1m).count() == len(live)
+    
+    # A fresh instance (e.g. after a restart) resumes from the stored watermark
+    MetricsRollup().run_once(db_session)
+    assert_same_metrics(read_metrics(db_session, start, end), live)
+    assert db_session.query(MetricRollup1m).count() == len(live)
+
+
+def test_metrics_rollup_picks_up_late_commits(db_session):
+    """Test logs that commit after a rollup with a lower ID or created_at are still rolled up."""
+    from app.database.models import TrafficLog
+    from app.services.metrics_rollup import MetricsRollup, read_metrics
+    
+    window = (datetime.now(timezone.utc) - timedelta(hours=1)).replace(second=0, microsecond=0)
+    start, end = window - timedelta(minutes=5), window + timedelta(minutes=5)
+    
+    def add_log(minute, **kwargs):
+        db_session.add(TrafficLog(
+            timestamp=window + timedelta(minutes=minute),
+            endpoint="/api/late",
+            method="GET",
+            status_code=200,
+            response_time_ms=100,
+            **kwargs
+        ))
+        db_session.commit()
+    
+    rollup = MetricsRollup()
+    add_log(0, id=1000)
+    rollup.run_once(db_session)
+    
+    # Lower ID than one already rolled up, committed afterwards
+    add_log(1, id=500)
+    # Stored (created_at) before the previous refresh, committed afterwards
+    add_log(2, created_at=datetime.now(timezone.utc) - timedelta(seconds=30))
+    rollup.run_once(db_session)
+    
+    minutes = {metric["time_window"] for metric in read_metrics(db_session, start, end)}
+    assert minutes == {window, window + timedelta(minutes=1), window + timedelta(minutes=2)}
 
+
+def test_metrics_rollup_only_reaggregates_touched_minutes(db_session):
+    """Test an old timestamp re-aggregates its own minute, not the whole span up to now."""
+    from app.database.models import TrafficLog
+    from app.services.metrics_rollup import MetricsRollup, read_metrics
+    
+    now = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    
+    def add_log(timestamp, **kwargs):
+        db_session.add(TrafficLog(
+            timestamp=timestamp,
+            endpoint="/api/old",
+            method="GET",
+            status_code=200,
+            response_time_ms=100,
+            **kwargs
+        ))
+        db_session.commit()
+    
+    rollup = MetricsRollup()
+    add_log(now - timedelta(hours=1))
+    rollup.run_once(db_session)
+    
+    # Stored long before the watermark, so outside the trailing window
+    skipped = now - timedelta(days=2)
+    add_log(skipped, created_at=datetime.now(timezone.utc) - timedelta(days=1))
+    # Newly stored with an old timestamp
+    old = now - timedelta(days=3)
+    add_log(old)
+    rollup.run_once(db_session)
+    
+    minutes = {metric["time_window"] for metric in read_metrics(db_session, old - timedelta(minutes=1), now)}
+    assert old in minutes
+    assert skipped not in minutes
+
+
+def test_get_metrics_gzip(client, db_session):
+    """Test large metrics responses are gzip-compressed when accepted."""
+    from app.database.models import TrafficLog
+    
+    window = (datetime.now(timezone.utc) - timedelta(hours=3)).replace(second=0, microsecond=0)
+    for i in range(60):
+        db_session.add(TrafficLog(
+            timestamp=window + timedelta(minutes=i),
+            endpoint="/api/gzip",
+            method="GET",
+            status_code=200,
+            response_time_ms=100 + i
+        ))
+    db_session.commit()
+    
+    response = client.get("/api/metrics", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.json()["total"] == 60
@@ -143,6 +143,36 @@ def test_evaluate_model_performance_confusion_matrix(client):
     assert total == data["total_predictions"]
 
 
+def test_evaluate_model_performance_counts_each_log_once(client, db_session):
+    """Test a log with several anomalies counts as one detection."""
+    from app.database.models import Anomaly, TrafficLog
+    
+    now = datetime.now(timezone.utc)
+    anomalous = TrafficLog(timestamp=now, endpoint="/api/a", method="GET", status_code=503, response_time_ms=50)
+    normal = TrafficLog(timestamp=now, endpoint="/api/b", method="GET", status_code=200, response_time_ms=50)
+    db_session.add_all([anomalous, normal])
+    db_session.commit()
+    for score in (0.7, 0.9):
+        db_session.add(Anomaly(
+            detected_at=now,
+            traffic_log_id=anomalous.id,
+            anomaly_score=score,
+            anomaly_type="error_spike"
+        ))
+    db_session.commit()
+    
+    response = client.post("/api/model-metrics/evaluate")
+    assert response.status_code == 200
+    data = response.json()
+    
+    assert data["total_predictions"] == 2
+    assert data["true_positives"] == 1
+    assert data["false_positives"] == 0
+    assert data["true_negatives"] == 1
+    assert data["false_negatives"] == 0
+    assert data["avg_anomaly_score"] == pytest.approx(0.9)
+
+
 def test_get_model_metrics_ordering(client, db_session):
     """Test that model metrics are returned in descending order by date."""
     from app.database.models import ModelPerformance
@@ -138,6 +138,38 @@ def test_feature_extractor_time_features():
     assert features["minute_of_hour"] == 30.0
 
 
+def test_feature_extractor_covers_model_features():
+    """Test extracted features and the training columns match the model's feature order."""
+    from app.services.anomaly_detector import FEATURE_ORDER
+    from ml.train import FEATURE_COLUMNS
+    
+    extractor = FeatureExtractor()
+    features = extractor.extract_features(TrafficData(
+        endpoint="/api/test",
+        method="GET",
+        status_code=200,
+        response_time_ms=50
+    ))
+    
+    assert set(FEATURE_ORDER) <= set(features)
+    assert tuple(FEATURE_COLUMNS) == FEATURE_ORDER
+
+
+def test_generate_training_data_class_mix():
+    """Test vectorized training data has the expected size, columns and class split."""
+    from ml.train import generate_training_data
+    
+    df = generate_training_data(n_samples=2000)
+    
+    assert len(df) == 2000
+    assert (df["is_server_error"] == (df["status_code"] >= 500)).all()
+    # Normal traffic comes first and is always fast and successful
+    normal = df.iloc[:1900]
+    assert normal["status_code"].isin([200, 201, 204]).all()
+    assert (normal["response_time_ms"] >= 10).all()
+    assert 0 < df["is_server_error"].sum() < 100
+
+
 def test_anomaly_detector_initialization():
     """Test anomaly detector initializes correctly."""
     detector = AnomalyDetector()
@@ -262,3 +294,336 @@ def test_anomaly_detector_classify_anomaly_types():
         if prediction["is_anomaly"]:
             assert prediction["anomaly_type"] in [expected_type, "pattern_anomaly"]
 
+
+def test_anomaly_detector_predict_batch_matches_predict():
+    """Test batch prediction returns the same results as per-row prediction."""
+    detector = AnomalyDetector()
+    extractor = FeatureExtractor()
+    
+    features_list = [
+        extractor.extract_features(TrafficData(
+            endpoint="/api/test",
+            method="GET",
+            status_code=status,
+            response_time_ms=response_time,
+            request_size_bytes=100,
+            response_size_bytes=500
+        ))
+        for status, response_time in [(200, 50), (500, 100), (200, 5000)]
+    ]
+    
+    batch_predictions = detector.predict_batch(features_list)
+    
+    assert len(batch_predictions) == len(features_list)
+    for features, prediction in zip(features_list, batch_predictions):
+        expected = detector.predict(features)
+        assert prediction["is_anomaly"] == expected["is_anomaly"]
+        assert prediction["anomaly_type"] == expected["anomaly_type"]
+        assert abs(prediction["anomaly_score"] - expected["anomaly_score"]) < 1e-6
+    
+    assert detector.predict_batch([]) == []
+
+
+def test_feature_extractor_batch_matches_extract_features():
+    """Test vectorized batch extraction matches per-record extraction and prediction."""
+    from datetime import timedelta, timezone
+    from app.services.anomaly_detector import FEATURE_ORDER
+    
+    detector = AnomalyDetector()
+    extractor = FeatureExtractor()
+    traffic_list = [
+        TrafficData(
+            timestamp=datetime(2024, 1, 1, hour, 30),
+            endpoint=endpoint,
+            method=method,
+            status_code=status,
+            response_time_ms=response_time,
+            request_size_bytes=req_size,
+            response_size_bytes=resp_size
+        )
+        for hour, endpoint, method, status, response_time, req_size, resp_size in [
+            (9, "/api/test", "GET", 200, 50, 100, 500),
+            (13, "/api/users", "post", 500, 0, None, None),
+            (23, "/api/upload", "PUT", 404, 5000, 15000000, 20000000),
+        ]
+    ]
+    traffic_list.append(TrafficData(
+        timestamp=datetime(2024, 3, 10, 23, 59, tzinfo=timezone(timedelta(hours=-5))),
+        endpoint="/api/late",
+        method="GET",
+        status_code=200,
+        response_time_ms=10
+    ))
+    
+    features = extractor.extract_features_batch(traffic_list)
+    
+    assert features.shape == (len(traffic_list), len(FEATURE_ORDER))
+    for traffic_data, row, prediction in zip(traffic_list, features.tolist(), detector.predict_array(features)):
+        expected = extractor.extract_features(traffic_data)
+        assert row == pytest.approx([expected[key] for key in FEATURE_ORDER])
+        assert prediction == detector.predict(expected)
+    
+    assert extractor.extract_features_batch([]).shape == (0, len(FEATURE_ORDER))
+
+
+def test_anomaly_detector_statistical_fallback_batch():
+    """Test the vectorized fallback rules pick the first matching rule per row."""
+    detector = AnomalyDetector()
+    detector.model_loaded = False
+    extractor = FeatureExtractor()
+    
+    cases = [
+        (200, 50, None, "normal", 0.0),
+        (500, 5000, None, "server_error", 0.9),
+        (200, 5000, 15000000, "response_time_spike", 0.85),
+        (200, 100, 15000000, "large_request", 0.8),
+        (200, 1500, None, "response_time_spike", 0.5),
+        (404, 50, None, "client_error", 0.3),
+    ]
+    features_list = [
+        extractor.extract_features(TrafficData(
+            endpoint="/api/test",
+            method="GET",
+            status_code=status,
+            response_time_ms=response_time,
+            request_size_bytes=req_size
+        ))
+        for status, response_time, req_size, _, _ in cases
+    ]
+    
+    predictions = detector.predict_batch(features_list)
+    for (_, _, _, expected_type, expected_score), prediction in zip(cases, predictions):
+        assert prediction["anomaly_type"] == expected_type
+        assert prediction["anomaly_score"] == expected_score
+
+
+def test_prediction_result_reads_like_a_dict():
+    """Test prediction results support the key access callers use."""
+    from app.services.anomaly_detector import PredictionResult
+    
+    prediction = PredictionResult(0.9, True, "server_error")
+    
+    assert prediction["is_anomaly"] is True
+    assert prediction.anomaly_type == "server_error"
+    assert dict(prediction) == {"anomaly_score": 0.9, "is_anomaly": True, "anomaly_type": "server_error"}
+    assert prediction == PredictionResult(0.9, True, "server_error")
+    assert "features" not in prediction
+    with pytest.raises(KeyError):
+        prediction["features"]
+
+
+def test_anomaly_detector_scaling_matches_scaler():
+    """Test cached scaler coefficients standardize exactly like the saved scaler."""
+    import numpy as np
+    
+    detector = AnomalyDetector()
+    if detector.scaler is None:
+        pytest.skip("Scaler not available")
+    
+    # Retraining saves a plain {"mean", "scale"} dict; older artifacts are a StandardScaler
+    if isinstance(detector.scaler, dict):
+        mean, scale = np.asarray(detector.scaler["mean"]), np.asarray(detector.scaler["scale"])
+        X = np.random.default_rng(0).uniform(0, 5000, size=(5, len(mean)))
+        expected = (X - mean) / scale
+    else:
+        X = np.random.default_rng(0).uniform(0, 5000, size=(5, len(detector.scaler.mean_)))
+        expected = detector.scaler.transform(X)
+    assert np.array_equal(detector._scale_features(X.copy()), expected)
+
+
+def test_anomaly_detector_parallel_scoring_matches_model():
+    """Test large batches scored in parallel chunks match a single decision_function call."""
+    import numpy as np
+    from app.services.anomaly_detector import _PARALLEL_MIN_ROWS
+    
+    detector = AnomalyDetector()
+    if not detector.model_loaded:
+        pytest.skip("Model not available")
+    
+    X = np.random.default_rng(0).normal(size=(_PARALLEL_MIN_ROWS * 3, detector.model.n_features_in_))
+    assert np.array_equal(detector._decision_function(X), detector.model.decision_function(X))
+
+
+def test_fit_scaler_matches_standard_scaler():
+    """Test the training scaler matches StandardScaler and loads into the detector."""
+    import numpy as np
+    from sklearn.preprocessing import StandardScaler
+    from ml.train import fit_scaler
+    
+    X = np.random.default_rng(0).uniform(0, 5000, size=(200, 4))
+    X[:, 2] = 7.0  # Constant column keeps a scale of 1
+    X_scaled, scaler = fit_scaler(X)
+    reference = StandardScaler().fit(X)
+    
+    assert np.allclose(scaler["mean"], reference.mean_)
+    assert np.allclose(scaler["scale"], reference.scale_)
+    assert np.allclose(X_scaled, reference.transform(X))
+    
+    detector = AnomalyDetector()
+    detector.scaler = scaler
+    detector._cache_scaler_coefficients()
+    assert np.allclose(detector._scale_features(X.copy()), X_scaled)
+
+
+def test_anomaly_detector_reuses_cached_scores():
+    """Test repeated feature vectors are scored from the cache with the same result."""
+    import numpy as np
+    from sklearn.ensemble import IsolationForest
+    from app.services.anomaly_detector import FEATURE_ORDER
+    from ml.train import fit_scaler
+    
+    # Fit a small model on the serving features, independent of the committed artifacts
+    X_scaled, scaler = fit_scaler(np.random.default_rng(0).uniform(0, 5000, size=(200, len(FEATURE_ORDER))))
+    detector = AnomalyDetector()
+    detector.model = IsolationForest(n_estimators=10, random_state=0).fit(X_scaled)
+    detector.scaler = scaler
+    detector._cache_scaler_coefficients()
+    detector.model_loaded = True
+    
+    extractor = FeatureExtractor()
+    features = extractor.extract_features(TrafficData(
+        endpoint="/api/cache",
+        method="GET",
+        status_code=200,
+        response_time_ms=80
+    ))
+    
+    first = detector.predict(features)
+    hits = detector.score_cache.hits
+    assert detector.predict(dict(features)) == first
+    assert detector.predict_batch([features])[0]["anomaly_score"] == first["anomaly_score"]
+    assert detector.score_cache.hits == hits + 2
+
+
+def test_anomaly_detector_quantized_cache_keys():
+    """Test quantized cache keys round near-identical requests to the same key."""
+    from app.services.anomaly_detector import _cache_key, _feature_values
+    
+    extractor = FeatureExtractor()
+    timestamp = datetime(2024, 1, 1, 12, 0)
+    
+    def features_for(response_time):
+        return extractor.extract_features(TrafficData(
+            timestamp=timestamp,
+            endpoint="/api/cache",
+            method="GET",
+            status_code=200,
+            response_time_ms=response_time,
+            request_size_bytes=100,
+            response_size_bytes=500
+        ))
+    
+    def key_for(response_time):
+        return _cache_key(_feature_values(features_for(response_time)))
+    
+    assert key_for(81) == key_for(79)
+    assert key_for(81) != key_for(120)
+
+
+def test_prediction_batcher_matches_predict():
+    """Test concurrent batched predictions match direct predictions."""
+    from concurrent.futures import ThreadPoolExecutor
+    from app.services.prediction_batcher import PredictionBatcher
+    
+    detector = AnomalyDetector()
+    extractor = FeatureExtractor()
+    batcher = PredictionBatcher(detector, max_batch_size=8, max_wait_ms=20)
+    
+    features_list = [
+        extractor.extract_features(TrafficData(
+            endpoint="/api/test",
+            method="GET",
+            status_code=status,
+            response_time_ms=response_time
+        ))
+        for status, response_time in [(200, 50), (500, 100), (200, 5000), (404, 20)] * 3
+    ]
+    
+    try:
+        with ThreadPoolExecutor(max_workers=len(features_list)) as pool:
+            predictions = list(pool.map(batcher.predict, features_list))
+    finally:
+        batcher.close()
+    
+    for features, prediction in zip(features_list, predictions):
+        expected = detector.predict(features)
+        assert prediction["is_anomaly"] == expected["is_anomaly"]
+        assert abs(prediction["anomaly_score"] - expected["anomaly_score"]) < 1e-6
+
+
+def test_traffic_writer_group_commit(db_session):
+    """Test concurrently stored traffic logs are committed with their own IDs."""
+    from concurrent.futures import ThreadPoolExecutor
+    from datetime import timedelta
+    from app.database.models import TrafficLog, Anomaly
+    from app.services.traffic_writer import TrafficWriter
+    
+    writer = TrafficWriter(max_batch_size=8, max_wait_ms=20)
+    now = datetime.now()
+    traffic = [
+        TrafficData(
+            timestamp=now - timedelta(seconds=i),
+            endpoint=f"/api/writer/{i}",
+            method="GET",
+            status_code=500 if i % 4 == 0 else 200,
+            response_time_ms=10 * i
+        )
+        for i in range(12)
+    ]
+    
+    def store(traffic_data):
+        prediction = {
+            "anomaly_score": 0.9,
+            "is_anomaly": traffic_data.status_code == 500,
+            "anomaly_type": "server_error"
+        }
+        return writer.store(db_session, traffic_data, {}, prediction)
+    
+    try:
+        with ThreadPoolExecutor(max_workers=len(traffic)) as pool:
+            log_ids = list(pool.map(store, traffic))
+    finally:
+        writer.close()
+    
+    assert len(set(log_ids)) == len(traffic)
+    for traffic_data, log_id in zip(traffic, log_ids):
+        assert db_session.get(TrafficLog, log_id).endpoint == traffic_data.endpoint
+    assert db_session.query(Anomaly).count() == 3
+
+
+def test_traffic_writer_isolates_bad_rows(db_session):
+    """Test a row the database rejects fails only its own request, not its whole group."""
+    from concurrent.futures import ThreadPoolExecutor
+    from sqlalchemy.exc import IntegrityError
+    from app.database.models import TrafficLog
+    from app.services.traffic_writer import TrafficWriter
+    
+    writer = TrafficWriter(max_batch_size=8, max_wait_ms=50)
+    now = datetime.now()
+    traffic = [
+        TrafficData(timestamp=now, endpoint=f"/api/writer/{i}", method="GET", status_code=200, response_time_ms=10)
+        for i in range(5)
+    ]
+    # Skips validation, so only the status code CHECK constraint rejects it
+    traffic[2] = TrafficData.model_construct(
+        timestamp=now, endpoint="/api/writer/bad", method="GET", status_code=999, response_time_ms=10,
+        request_size_bytes=None, response_size_bytes=None, ip_address=None, user_agent=None
+    )
+    prediction = {"anomaly_score": 0.1, "is_anomaly": False, "anomaly_type": "normal"}
+    
+    def store(traffic_data):
+        try:
+            return writer.store(db_session, traffic_data, {}, prediction)
+        except IntegrityError as e:
+            return e
+    
+    try:
+        with ThreadPoolExecutor(max_workers=len(traffic)) as pool:
+            results = list(pool.map(store, traffic))
+    finally:
+        writer.close()
+    
+    assert isinstance(results[2], IntegrityError)
+    stored = [result for i, result in enumerate(results) if i != 2]
+    assert all(isinstance(log_id, int) for log_id in stored)
+    assert db_session.query(TrafficLog).count() == 4
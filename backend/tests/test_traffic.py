@@ -165,3 +165,31 @@ def test_ingest_traffic_empty_endpoint(client):
     # Should still work, but might be unusual
     assert response.status_code in [200, 422]  # May or may not validate
 
+
+def test_ingest_traffic_batch(client, db_session, sample_traffic_data):
+    """Test batch traffic ingestion stores every record."""
+    from app.database.models import TrafficLog
+    
+    error_data = dict(sample_traffic_data, status_code=500, response_time_ms=5000)
+    response = client.post("/api/traffic/batch", json=[sample_traffic_data, error_data, sample_traffic_data])
+    assert response.status_code == 200
+    data = response.json()
+    assert data["success"] is True
+    assert data["ingested"] == 3
+    assert len(data["results"]) == 3
+    assert data["anomalies_detected"] == sum(r["anomaly_detected"] for r in data["results"])
+    assert db_session.query(TrafficLog).count() == 3
+
+
+def test_ingest_traffic_rejects_out_of_range_values(client, sample_traffic_data):
+    """Test status codes and sizes outside valid HTTP ranges are rejected."""
+    for invalid in ({"status_code": 999}, {"status_code": 42}, {"response_time_ms": -1}, {"request_size_bytes": -5}):
+        response = client.post("/api/traffic", json=dict(sample_traffic_data, **invalid))
+        assert response.status_code == 422
+
+
+def test_ingest_traffic_rejects_oversized_strings(client, sample_traffic_data):
+    """Test strings longer than their columns are rejected before reaching the database."""
+    for invalid in ({"endpoint": "/" + "a" * 255}, {"method": "X" * 11}, {"ip_address": "1" * 46}):
+        response = client.post("/api/traffic", json=dict(sample_traffic_data, **invalid))
+        assert response.status_code == 422